@@ -0,0 +1,102 @@
+"""
+Checks of the routing tables against slower references: the incremental repairs against a full computation,
+the compressed next hops against the full matrix and Yen's k shortest paths against a brute force enumeration.
+\nRun with: python -m pytest TEST
+"""
+from os import path
+import sys
+
+from numpy import array_equal, isclose, isfinite, random
+import pytest
+
+sys.path.insert(0, path.dirname(path.dirname(path.abspath(__file__))))
+from topology import EqualCostHops, Graph, RoutingTables, k_shortest_paths, proportional_rules  # noqa: E402
+
+
+def build(float_weights: bool, ecmp: bool = True, size: int = 150, seed: int = 4) -> Graph:
+    """A bulk Graph with its integer weights (many ties), or with float weights computed again from scratch"""
+    graph = Graph(size=size, rules=proportional_rules(size), seed=seed, generator="bulk", ecmp=ecmp)
+    if float_weights:
+        for node_A, node_B, weight in zip(*(values.tolist() for values in graph.matrix.edges())):
+            graph.set_link(graph.matrix, node_A, node_B, weight * 1.1 + 0.37)
+        graph._generate_routing_table(ecmp=ecmp)
+    return (graph)
+
+
+def assert_matches_full_computation(graph: Graph):
+    """The repaired distances, next hops and equal-cost next hops are those of a full computation"""
+    csr = graph.matrix.csr()
+    assert len(graph.routes.mismatches(*csr)) == 0
+    full = RoutingTables.compute(*csr, method="bellman")
+    reachable = isfinite(full.distance)
+    assert array_equal(reachable, isfinite(graph.routes.distance))
+    assert isclose(graph.routes.distance[reachable], full.distance[reachable], rtol=1e-6).all()
+    equal_cost = EqualCostHops.compute(*csr, graph.routes.distance, graph.routes.next_hop)
+    for name in ("keys", "offsets", "hops"):
+        assert array_equal(getattr(graph.routes.equal_cost, name), getattr(equal_cost, name))
+
+
+@pytest.mark.parametrize("float_weights", [False, True])
+def test_link_events_match_full_computation(float_weights: bool):
+    graph = build(float_weights)
+    generator = random.default_rng(1)
+    node_A, node_B, _ = graph.matrix.edges()
+    for position in generator.integers(0, len(node_A), 24).tolist():
+        a, b = int(node_A[position]), int(node_B[position])
+        weight = graph.get_link(graph.matrix, a, b)
+        if not weight:
+            continue
+        event = position % 3
+        if event == 0:
+            graph.remove_link(a, b)
+        elif event == 1:
+            graph.update_link(a, b, float(weight) * generator.uniform(1.2, 3))     # Longer
+        else:
+            graph.update_link(a, b, float(weight) * generator.uniform(0.2, 0.8))   # Shorter
+        assert_matches_full_computation(graph)
+    for _ in range(8):  # New links, integer weights tie with the existing routes
+        a, b = generator.choice(graph.size, 2, replace=False).tolist()
+        weight = generator.uniform(1, 30) if float_weights else int(generator.integers(1, 30))
+        graph.update_link(a, b, weight)
+        assert_matches_full_computation(graph)
+
+
+@pytest.mark.parametrize("float_weights", [False, True])
+def test_compressed_lookup_matches_full_matrix(float_weights: bool):
+    graph = build(float_weights, ecmp=False, size=400)
+    next_hop = graph.routes.next_hop.copy()
+    graph.compress_routes()
+    assert graph.routes.compressed
+    sources, destinations = random.default_rng(0).integers(0, graph.size, (2, 4000))
+    assert array_equal(graph.routes.next_hop[sources, destinations], next_hop[sources, destinations])
+    assert array_equal(graph.routes.next_hop[range(graph.size)], next_hop)
+
+
+def simple_path_costs(indptr, indices, weights, source: int, target: int) -> list:
+    """The sorted costs of every simple path from source to target"""
+    costs = []
+
+    def walk(route: list, cost: float):
+        if route[-1] == target:
+            costs.append(cost)
+            return
+        node = route[-1]
+        for neighbor, weight in zip(indices[indptr[node]:indptr[node + 1]].tolist(),
+                                    weights[indptr[node]:indptr[node + 1]].tolist()):
+            if neighbor not in route:
+                walk(route + [neighbor], cost + weight)
+    walk([source], 0)
+    return (sorted(costs))
+
+
+@pytest.mark.parametrize("source, target", [(0, 11), (3, 9), (5, 6), (11, 2)])
+def test_yen_matches_brute_force(source: int, target: int):
+    graph = Graph(size=12, rules=(2, 3, 7), seed=1, generator="bulk")
+    indptr, indices, weights = graph.matrix.csr()
+    expected = simple_path_costs(indptr, indices, weights, source, target)[:8]
+    paths = k_shortest_paths(indptr, indices, weights, source, target, 8)
+    assert isclose([cost for cost, _ in paths], expected).all()
+    assert len({tuple(route) for _, route in paths}) == len(paths)
+    for cost, route in paths:
+        assert route[0] == source and route[-1] == target and len(set(route)) == len(route)
+        assert isclose(sum(graph.get_link(graph.matrix, a, b) for a, b in zip(route, route[1:])), cost)
@@ -0,0 +1,273 @@
+"""
+Benchmark of the hot paths of topology: generation, connectivity, routing tables, traceroute, link updates and export.
+Every configuration of the sweep runs in a fresh process, so its peak RSS is its own.
+The repaired routing tables are compared with a full computation: a mismatch fails the run like a regression.
+\nUsage: python benchmark.py [--sizes 100 1000 10000] [--output results.json] [--compare previous.json]
+\nMemory: the Backbone is 10% of the Nodes and its pairs are linked with a probability of 75%,
+so the links grow with size² at about 145 bytes each: 10000 Nodes (0.4M links) peak at 120 MiB, 30000 Nodes (3.4M links)
+at 540 MiB and 100000 Nodes (37M links) at about 5.5 GiB, which is why the default sweep stops at 10000.
+A configuration whose process fails, killed when out of memory included, is recorded in failed,
+and the results are written after every size so the finished ones are kept.
+"""
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from datetime import datetime
+from json import dump, load as load_json
+from multiprocessing import get_context
+from os import path, cpu_count, listdir
+from subprocess import run
+from tempfile import TemporaryDirectory
+from time import perf_counter
+import platform
+import sys
+
+from numpy import __version__ as numpy_version, count_nonzero, unique
+from numpy.random import default_rng
+
+from topology import Graph, RoutingTables, proportional_rules
+
+try:
+    from resource import getrusage, RUSAGE_SELF
+except ImportError:     # Windows
+    getrusage = None
+
+SIZES = (100, 1000, 10000)  # 100000 needs about 5.5 GiB, see the module docstring
+PHASES = ("generate", "is_connected", "routing", "traceroute", "traceroute_many", "routing_update", "export")
+
+
+def peak_rss():
+    """The peak resident memory of the process in bytes, None where the resource module does not exist"""
+    if getrusage is None:
+        return (None)
+    return (getrusage(RUSAGE_SELF).ru_maxrss * (1 if sys.platform == "darwin" else 1024))
+
+
+class Phases:
+    """
+    Records the wall time, the peak RSS reached and the operation counts of each phase.
+    The counters of the Graph's instrumentation that grew during a phase are added to its counts.
+    \nUse: with phases.measure("name") as ops: ops["links"] = ...
+    """
+
+    def __init__(self, graph: Graph):
+        self.graph = graph
+        self.results = {}
+
+    def measure(self, name: str):
+        return (Measure(self, name))
+
+
+class Measure:
+    def __init__(self, phases: Phases, name: str):
+        self.phases = phases
+        self.name = name
+        self.ops = {}
+
+    def __enter__(self):
+        self.counters = dict(self.phases.graph.instrumentation.counters)
+        self.rss = peak_rss()
+        self.start = perf_counter()
+        return (self.ops)
+
+    def __exit__(self, *error):
+        seconds = perf_counter() - self.start
+        rss = peak_rss()
+        for name, amount in self.phases.graph.instrumentation.counters.items():
+            if amount != self.counters.get(name, 0):
+                self.ops[name] = amount - self.counters.get(name, 0)
+        self.phases.results[self.name] = {"seconds": seconds, "peak_rss": rss,
+                                          "rss_growth": rss - self.rss if rss is not None else None, "ops": self.ops}
+        return (False)
+
+
+def run_configuration(size: int, rules: tuple, **options) -> dict:
+    """
+    Runs every phase on one Graph. Phases above their size limit are recorded as skipped.
+    \nOptional Arguments:
+    \n - generator: str {legacy, bulk} = bulk
+    \n - routing: str {auto, bellman, floyd, scipy} = auto
+    \n - workers: int = 1
+    \n - compress_routes: bool = False -> Compute compressed routing tables, see CompressedNextHop.
+    \n - routing_limit: int = 5000 -> The routing tables hold two size x size matrices.
+    \n - export_limit: int = 2000
+    \n - queries: int = 1000 -> Number of random traceroutes.
+    \n - updates: int = 100 -> Number of link events (latency drift, removal, new link) repaired by update_link.
+    \n - seed: int = 0
+    \n - profile: str {None, cprofile, tracemalloc} = None -> The profiles are added to the results.
+    """
+    generator = options.get("generator", "bulk")
+    seed = options.get("seed", 0)
+    skipped = {}
+
+    graph = Graph(f"benchmark_{size}", size, rules, no_generation=True, seed=seed, instrument=True,
+                  profile=options.get("profile"))
+    phases = Phases(graph)
+    with phases.measure("generate") as ops:
+        graph._generate_links(rules, generator=generator, seed=seed)
+    ops["links"] = len(graph.matrix.edges()[0])
+
+    graph.components = None     # Otherwise the union-find kept in sync by the generation answers in O(1)
+    with phases.measure("is_connected") as ops:
+        connected = graph.is_connected()
+    ops["components"] = len(unique(graph.components.roots()))
+    ops["connected"] = connected
+
+    if size > options.get("routing_limit", 5000):
+        skipped.update(routing="size above routing_limit", traceroute="needs the routing tables",
+                       traceroute_many="needs the routing tables")
+    else:
+        with phases.measure("routing") as ops:
+            graph._generate_routing_table(options.get("routing", "auto"), options.get("workers", 1),
+                                          options.get("compress_routes", False))
+        ops["method"] = graph.routes.method
+        ops["sources"] = size
+        ops["pairs"] = size * size
+        ops["routing_bytes"] = graph.routes.nbytes
+        if not graph.routes.compressed:
+            ops["reachable_pairs"] = int(count_nonzero(graph.routes.next_hop >= 0)) + size
+
+        rng = default_rng(seed)
+        queries = options.get("queries", 1000)
+        sources, destinations = rng.integers(0, size, queries), rng.integers(0, size, queries)
+        with phases.measure("traceroute") as ops:
+            for node_A, node_B in zip(sources.tolist(), destinations.tolist()):
+                graph.traceroute(node_A, node_B, display=False)
+        with phases.measure("traceroute_many") as batch:
+            hops, _ = graph.traceroute_many(sources, destinations)
+        for counts in (ops, batch):
+            counts["unreachable"] = int(count_nonzero(hops < 0))
+
+        if graph.routes.compressed:
+            skipped["routing_update"] = "compressed routing tables cannot be updated"
+        else:
+            node_A, node_B, weights = graph.matrix.edges()
+            picked = rng.choice(len(node_A), min(options.get("updates", 100), len(node_A)), replace=False)
+            with phases.measure("routing_update") as ops:
+                changed = 0
+                for event, link in enumerate(picked.tolist()):
+                    link_A, link_B = int(node_A[link]), int(node_B[link])
+                    match event % 3:
+                        case 0:     # Latency drift: the weights stop being integers
+                            changed += len(graph.update_link(link_A, link_B, float(weights[link]) * 1.1 + 0.37))
+                        case 1:
+                            changed += len(graph.remove_link(link_A, link_B))
+                        case 2:     # A new link between the ends of two picked links
+                            other = int(node_B[picked[event - 1]])
+                            if other != link_A and graph.get_link(graph.matrix, link_A, other) == 0:
+                                changed += len(graph.update_link(link_A, other, float(weights[link]) + 0.5))
+            ops["events"] = len(picked)
+            ops["changed_pairs"] = changed
+            ops["mismatched_pairs"] = len(graph.routes.mismatches(*graph.matrix.csr()))
+
+    if size > options.get("export_limit", 2000):
+        skipped["export"] = "size above export_limit"
+    else:
+        tables = ("edges", "routing") if graph.routes is not None else ("edges",)
+        with TemporaryDirectory() as folder:
+            with phases.measure("export") as ops:
+                files = graph.export(format="csv", tables=tables, folder=folder)
+            ops["files"] = len(files)
+            ops["bytes"] = sum(path.getsize(path.join(folder, file)) for file in listdir(folder))
+        ops["rows"] = len(graph.matrix.edges()[0]) + (size if graph.routes is not None else 0)
+
+    return ({"size": size, "rules": list(rules), "generator": generator, "backend": graph.backend,
+             "phases": phases.results, "skipped": skipped, "profiles": graph.stats()["profiles"]})
+
+
+def environment() -> dict:
+    """Describes the machine and the version of the code, to compare results between versions"""
+    commit = run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                 cwd=path.dirname(path.abspath(__file__)))
+    return ({"date": datetime.now().isoformat(timespec="seconds"), "commit": commit.stdout.strip() or None,
+             "python": platform.python_version(), "numpy": numpy_version, "platform": platform.platform(),
+             "cpu_count": cpu_count()})
+
+
+def compare(results: dict, previous: dict, threshold: float, floor: float = 0.01) -> list:
+    """
+    Returns the phases whose wall time grew by more than threshold (a ratio) since the previous results,
+    as [(size, phase, previous seconds, seconds), ]. Phases faster than floor seconds are only noise and ignored.
+    """
+    before = {(item["size"], item["generator"]): item["phases"] for item in previous["results"] if "phases" in item}
+    regressions = []
+    for item in results["results"]:
+        for phase, measure in item.get("phases", {}).items():  # A failed configuration has no phases
+            old = before.get((item["size"], item["generator"]), {}).get(phase)
+            if old and measure["seconds"] > max(old["seconds"] * threshold, floor):
+                regressions.append((item["size"], phase, old["seconds"], measure["seconds"]))
+    return (regressions)
+
+
+def report(results: dict):
+    """Prints a table of the wall times (seconds) and peak RSS (MiB) of every phase"""
+    print(f"{'size':>8} {'phase':<16} {'seconds':>10} {'peak MiB':>10}  ops")
+    for item in results["results"]:
+        if "failed" in item:
+            print(f"{item['size']:>8} {'':<16} {'failed':>10} {'':>10}  {item['failed']}")
+            continue
+        for phase in PHASES:
+            if phase in item["skipped"]:
+                print(f"{item['size']:>8} {phase:<16} {'skipped':>10} {'':>10}  {item['skipped'][phase]}")
+            elif phase in item["phases"]:
+                measure = item["phases"][phase]
+                rss = f"{measure['peak_rss'] / (1 << 20):.1f}" if measure["peak_rss"] is not None else "?"
+                ops = ", ".join(f"{key}={value}" for key, value in measure["ops"].items())
+                print(f"{item['size']:>8} {phase:<16} {measure['seconds']:>10.4f} {rss:>10}  {ops}")
+
+
+def main(arguments: list = None) -> int:
+    parser = ArgumentParser(description="Benchmark of the Graph generation, connectivity, routing, traceroute and export")
+    parser.add_argument("--sizes", type=int, nargs="+", default=SIZES, help="Number of Nodes of each configuration")
+    parser.add_argument("--generator", choices=["legacy", "bulk"], default="bulk")
+    parser.add_argument("--routing", choices=RoutingTables.METHODS, default="auto")
+    parser.add_argument("--workers", type=int, default=1, help="Processes computing the routing tables, 0 uses every core")
+    parser.add_argument("--compress-routes", action="store_true", help="Compute compressed routing tables")
+    parser.add_argument("--routing-limit", type=int, default=5000, help="Skip the routing above this size")
+    parser.add_argument("--export-limit", type=int, default=2000, help="Skip the export above this size")
+    parser.add_argument("--queries", type=int, default=1000, help="Number of random traceroutes")
+    parser.add_argument("--updates", type=int, default=100, help="Number of link events repaired in place")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--profile", choices=["cprofile", "tracemalloc"], help="Also profile every phase")
+    parser.add_argument("--output", default="benchmark_results.json", help="JSON file of the results")
+    parser.add_argument("--compare", help="Previous JSON results, exits with 1 if a phase regressed")
+    parser.add_argument("--threshold", type=float, default=1.25, help="Slowdown ratio counted as a regression")
+    parser.add_argument("--floor", type=float, default=0.01, help="Phases faster than this (seconds) are not compared")
+    args = parser.parse_args(arguments)
+
+    options = {"generator": args.generator, "routing": args.routing, "workers": args.workers, "seed": args.seed,
+               "compress_routes": args.compress_routes,
+               "routing_limit": args.routing_limit, "export_limit": args.export_limit, "queries": args.queries,
+               "updates": args.updates, "profile": args.profile}
+    results = {"environment": environment(), "options": options, "results": []}
+    for size in args.sizes:
+        # A new process per configuration: the peak RSS of the previous ones does not leak into it
+        with ProcessPoolExecutor(max_workers=1, mp_context=get_context("spawn")) as executor:
+            try:
+                item = executor.submit(run_configuration, size, proportional_rules(size), **options).result()
+            except BrokenProcessPool:
+                item = {"size": size, "generator": args.generator, "failed": "the process died, most likely out of memory"}
+            except Exception as error:
+                item = {"size": size, "generator": args.generator, "failed": f"{type(error).__name__}: {error}"}
+        results["results"].append(item)
+        report({"results": [item]})
+        with open(args.output, "w", encoding="utf-8") as file:  # Kept even if a later size kills the run
+            dump(results, file, indent=4)
+    print(f"Results written to \033[96m{path.abspath(args.output)}\033[0m")
+
+    mismatched = [item["size"] for item in results["results"]
+                  if item.get("phases", {}).get("routing_update", {}).get("ops", {}).get("mismatched_pairs")]
+    for size in mismatched:
+        print(f"\033[91mThe repaired routing tables of {size} Nodes differ from a full computation\033[0m")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as file:
+            regressions = compare(results, load_json(file), args.threshold, args.floor)
+        for size, phase, before, after in regressions:
+            print(f"\033[91mRegression: {phase} at {size} Nodes went from {before:.4f}s to {after:.4f}s\033[0m")
+        return (1 if regressions or mismatched else 0)
+    return (1 if mismatched else 0)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
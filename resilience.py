@@ -0,0 +1,261 @@
+"""
+Monte Carlo resilience sweep: many random Graphs of the same rules, each hit by failure models,
+measuring the connectivity rate, the latency distribution and the path stretch after the failures.
+\nThe trials run in worker processes by chunks. A worker reuses one Graph object and its failure masks (per link,
+grown to the largest trial, and per Node) for all its trials, each trial drawing a new adjacency store.
+It returns the aggregated statistics of its chunk only: no adjacency outlives its trial.
+\nUsage: python resilience.py --trials 10000 --link-loss 0.05 --tier1-loss 1 [--rules 10 20 70] [--workers 0]
+"""
+from argparse import ArgumentParser
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from json import dump, dumps
+from os import cpu_count
+import sys
+
+from numpy import arange, bincount, cumsum, empty, float64, int64, isfinite, maximum, minimum, ones, searchsorted, zeros
+from numpy.random import default_rng
+
+from topology import Graph, DisjointSet, build_csr, routing_rows, scipy_shortest_paths
+
+
+class LinkLoss:
+    """Every link fails independently with the given probability"""
+
+    def __init__(self, probability: float):
+        self.probability = probability
+        self.name = f"link_loss_{probability:g}"
+
+    def apply(self, rng, graph: Graph, node_A, node_B, kept, alive):
+        """Clears kept (per link) and alive (per Node) where the failure hits, both start full of True"""
+        kept &= rng.random(len(node_A)) >= self.probability
+
+
+class Tier1Loss:
+    """The given number of Backbone Nodes, drawn at random, fail with all their links"""
+
+    def __init__(self, count: int = 1):
+        self.count = count
+        self.name = f"tier1_loss_{count}"
+
+    def apply(self, rng, graph: Graph, node_A, node_B, kept, alive):
+        start, stop = graph.nodes.tier_ranges[1]
+        alive[rng.choice(arange(start, stop), min(self.count, stop - start), replace=False)] = False
+        kept &= alive[node_A] & alive[node_B]
+
+
+def shortest_distances(indptr, indices, weights, sources):
+    """The (len(sources), size) shortest distances, with SciPy if it's installed and Bellman-Ford otherwise"""
+    try:
+        return (scipy_shortest_paths(indptr, indices, weights, sources)[0])
+    except ImportError:
+        return (routing_rows(indptr, indices, weights, sources)[0])
+
+
+class ResilienceStats:
+    """
+    Streamed statistics of a failure model: counts, sums and fixed bin histograms, merged across workers.
+    \n - latency_before, latency_after: histograms of the shortest distances (bins of 1 unit, the last one is overflow).
+    \n - stretch: histogram of distance after / distance before (bins of STRETCH_STEP, the last one is overflow).
+    """
+
+    LATENCY_BINS = 1000
+    STRETCH_STEP = 0.01
+    STRETCH_BINS = 500
+
+    def __init__(self, name: str):
+        self.name = name
+        self.trials = 0
+        self.base_connected = 0  # Graphs connected before the failure
+        self.connected = 0  # Graphs whose surviving Nodes are still connected
+        self.reachable = 0.0  # Sum of the fraction of surviving pairs still connected
+        self.pairs = 0  # Sampled pairs connected before the failure
+        self.lost_pairs = 0  # Among them, those disconnected by the failure
+        self.latency_sum = zeros(2, dtype=float64)  # Before, after
+        self.latency_squares = zeros(2, dtype=float64)
+        self.latency_counts = zeros(2, dtype=int64)
+        self.latency_before = zeros(self.LATENCY_BINS + 1, dtype=int64)
+        self.latency_after = zeros(self.LATENCY_BINS + 1, dtype=int64)
+        self.stretch = zeros(self.STRETCH_BINS + 1, dtype=int64)
+        self.stretch_sum = 0.0
+
+    def add(self, base_connected: bool, connected: bool, reachable: float, before, after):
+        """Adds a trial: before and after are the distances of the same sampled pairs, inf if disconnected"""
+        self.trials += 1
+        self.base_connected += base_connected
+        self.connected += connected
+        self.reachable += reachable
+        linked = isfinite(before)
+        still = linked & isfinite(after)
+        self.pairs += int(linked.sum())
+        self.lost_pairs += int((linked & ~still).sum())
+        for column, values, histogram in ((0, before[linked], self.latency_before), (1, after[still], self.latency_after)):
+            self.latency_sum[column] += values.sum()
+            self.latency_squares[column] += (values * values).sum()
+            self.latency_counts[column] += len(values)
+            histogram += bincount(minimum(values, self.LATENCY_BINS).astype(int64), minlength=self.LATENCY_BINS + 1)
+        stretch = after[still] / before[still]
+        self.stretch_sum += stretch.sum()
+        bins = minimum((stretch - 1) / self.STRETCH_STEP, self.STRETCH_BINS).astype(int64)
+        self.stretch += bincount(bins, minlength=self.STRETCH_BINS + 1)
+
+    def merge(self, other):
+        for key in ("trials", "base_connected", "connected", "reachable", "pairs", "lost_pairs", "stretch_sum"):
+            setattr(self, key, getattr(self, key) + getattr(other, key))
+        for key in ("latency_sum", "latency_squares", "latency_counts", "latency_before", "latency_after", "stretch"):
+            getattr(self, key)[...] += getattr(other, key)
+        return (self)
+
+    @staticmethod
+    def percentiles(histogram, step: float, offset: float = 0.0, quantiles: tuple = (0.5, 0.9, 0.99)) -> dict:
+        """Percentiles read from a histogram, as the lower bound of the bin holding them"""
+        total = histogram.sum()
+        if total == 0:
+            return ({f"p{round(quantile * 100)}": None for quantile in quantiles})
+        positions = searchsorted(cumsum(histogram), [quantile * total for quantile in quantiles])
+        return ({f"p{round(quantile * 100)}": round(offset + position * step, 6)
+                 for quantile, position in zip(quantiles, positions.tolist())})
+
+    def summary(self) -> dict:
+        trials = max(1, self.trials)
+        counts = maximum(self.latency_counts, 1)
+        mean = self.latency_sum / counts
+        deviation = maximum(self.latency_squares / counts - mean * mean, 0) ** 0.5
+        still = self.latency_counts[1]
+        return ({
+            "trials": self.trials,
+            "base_connected_rate": self.base_connected / trials,
+            "connected_rate": self.connected / trials,
+            "reachable_pairs": self.reachable / trials,
+            "lost_pairs_rate": self.lost_pairs / max(1, self.pairs),
+            "latency_before": {"mean": float(mean[0]), "std": float(deviation[0]), **self.percentiles(self.latency_before, 1)},
+            "latency_after": {"mean": float(mean[1]), "std": float(deviation[1]), **self.percentiles(self.latency_after, 1)},
+            "stretch": {"mean": float(self.stretch_sum / still) if still else None,
+                        **self.percentiles(self.stretch, self.STRETCH_STEP, 1.0)},
+        })
+
+
+def run_trials(rules: tuple, failures: list, trials: range, **options) -> dict:
+    """
+    Worker: runs the given trial numbers and returns {failure name: ResilienceStats}.
+    Trial t draws everything from default_rng([seed, t]), so the results do not depend on the chunks.
+    """
+    seed = options.get("seed", 0)
+    samples = options.get("samples", 8)
+    size = sum(rules)
+    graph = Graph("trial", size, rules, backend="sparse", no_generation=True)
+    stats = {failure.name: ResilienceStats(failure.name) for failure in failures}
+    masks = empty(0, dtype=bool)  # kept is a view of its first links, it only grows when a trial has more
+    alive = ones(size, dtype=bool)
+    for trial in trials:
+        graph.rng = rng = default_rng([seed, trial])
+        if options.get("connected", False):
+            graph._generate_links(rules, generator="bulk", connected=True, max_attempts=options.get("max_attempts", 100))
+        else:
+            graph._generate_bulk_links(rules)
+        node_A, node_B, weights = graph.matrix.edges()
+        base_connected = graph.is_connected()
+        sources = rng.choice(size, min(samples, size), replace=False)
+        before = shortest_distances(*graph.matrix.csr(), sources)
+
+        if len(masks) < len(node_A):
+            masks = empty(2 * len(node_A), dtype=bool)
+        kept = masks[:len(node_A)]
+        for failure in failures:
+            kept[:] = True
+            alive[:] = True
+            failure.apply(rng, graph, node_A, node_B, kept, alive)
+            roots = DisjointSet.from_edges(size, node_A[kept], node_B[kept]).roots()[alive]
+            component_size = bincount(roots, minlength=size)
+            survivors = int(alive.sum())
+            reachable = float((component_size * (component_size - 1.0)).sum()) / max(1, survivors * (survivors - 1))
+            live_sources = sources[alive[sources]]
+            after = shortest_distances(*build_csr(size, node_A[kept], node_B[kept], weights[kept]), live_sources)
+            # Pairs between two surviving distinct Nodes only
+            pairs = alive[None, :] & (arange(size)[None, :] != live_sources[:, None])
+            stats[failure.name].add(base_connected, len(component_size.nonzero()[0]) <= 1, reachable,
+                                    before[alive[sources]][pairs], after[pairs])
+    return (stats)
+
+
+def iter_sweep(rules: tuple = (10, 20, 70), trials: int = 1000, failures: list = None, **kwargs):
+    """
+    Runs the trials in worker processes and yields (trials done, {failure name: ResilienceStats}) as chunks complete,
+    the statistics being merged over every chunk done so far.
+    \nOptional Arguments:
+    \n - failures: list = [LinkLoss(0.05), Tier1Loss(1)] -> The failure models, each applied to every trial Graph.
+    \n - seed: int = 0
+    \n - workers: int = 0 -> Number of processes, 0 uses every core, 1 runs in this process.
+    \n - chunk: int = 250 -> Number of trials per task.
+    \n - samples: int = 8 -> Number of sources whose distances to every Node are measured per trial.
+    \n - connected: bool = False -> Generate each trial Graph again until it's connected.
+    """
+    failures = failures if failures is not None else [LinkLoss(0.05), Tier1Loss(1)]
+    if len({failure.name for failure in failures}) != len(failures):
+        raise ValueError("Every failure model must have a different name")
+    chunk = kwargs.get("chunk", 250)
+    workers = kwargs.get("workers", 0) or cpu_count() or 1
+    options = {key: kwargs[key] for key in ("seed", "samples", "connected", "max_attempts") if key in kwargs}
+    chunks = [range(start, min(start + chunk, trials)) for start in range(0, trials, chunk)]
+    total = {failure.name: ResilienceStats(failure.name) for failure in failures}
+    done = 0
+    if workers <= 1:
+        for trial_range in chunks:
+            for name, stats in run_trials(rules, failures, trial_range, **options).items():
+                total[name].merge(stats)
+            done += len(trial_range)
+            yield (done, total)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {executor.submit(run_trials, rules, failures, trial_range, **options): len(trial_range)
+                   for trial_range in chunks}
+        for future in as_completed(futures):
+            for name, stats in future.result().items():
+                total[name].merge(stats)
+            done += futures[future]
+            yield (done, total)
+
+
+def sweep(rules: tuple = (10, 20, 70), trials: int = 1000, failures: list = None, **kwargs) -> dict:
+    """
+    Runs a whole sweep, see iter_sweep, and returns {failure name: summary}.
+    \nOptional Arguments:
+    \n - progress: callable(trials done, {failure name: summary}) -> Called every time a chunk completes.
+    """
+    progress = kwargs.pop("progress", None)
+    total = {}
+    for done, total in iter_sweep(rules, trials, failures, **kwargs):
+        if progress is not None:
+            progress(done, {name: stats.summary() for name, stats in total.items()})
+    return ({name: stats.summary() for name, stats in total.items()})
+
+
+def main(arguments: list = None) -> int:
+    parser = ArgumentParser(description="Monte Carlo sweep of the resilience of random Graphs to failures")
+    parser.add_argument("--rules", type=int, nargs=3, default=[10, 20, 70], metavar=("BACKBONE", "TRANSIT", "REGULAR"))
+    parser.add_argument("--trials", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--workers", type=int, default=0, help="Processes running the trials, 0 uses every core")
+    parser.add_argument("--chunk", type=int, default=250, help="Trials per task")
+    parser.add_argument("--samples", type=int, default=8, help="Sources whose distances are measured per trial")
+    parser.add_argument("--connected", action="store_true", help="Only keep connected Graphs, as the generator does")
+    parser.add_argument("--link-loss", type=float, action="append", default=[], help="Probability of losing a link")
+    parser.add_argument("--tier1-loss", type=int, action="append", default=[], help="Number of Backbone Nodes lost")
+    parser.add_argument("--output", help="JSON file of the final statistics")
+    args = parser.parse_args(arguments)
+
+    failures = [LinkLoss(probability) for probability in args.link_loss] + [Tier1Loss(count) for count in args.tier1_loss]
+
+    def progress(done: int, summaries: dict):
+        rates = ", ".join(f"{name}: connected {summary['connected_rate']:.3f}" for name, summary in summaries.items())
+        print(f"{done}/{args.trials} trials, {rates}", file=sys.stderr)
+    results = sweep(tuple(args.rules), args.trials, failures or None, seed=args.seed, workers=args.workers,
+                    chunk=args.chunk, samples=args.samples, connected=args.connected, progress=progress)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            dump(results, file, indent=4)
+    print(dumps(results, indent=4))
+    return (0)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,227 @@
+"""
+Asynchronous traceroute query server over a Graph snapshot (see Graph.save), answering JSON lines.
+The snapshot is loaded once and memory mapped read-only (Graph.load with read_only): the queries never modify it.
+Concurrent queries are gathered in batches answered with vectorized lookups (Graph.traceroute_many).
+Every answer waits for the client to read the previous ones (drain), and a client cannot have more than
+max_pending queries waiting: a client that does not read its answers stops being read.
+\nRequest: {"id": any, "op": "route" | "distance" | "next_hop", "source": name | index, "destination": name | index}
+\nAnswers, with the same id:
+\n - route: {"id", "ok": true, "route": [names], "distance": float | null}, the route is empty if there is none.
+\n - distance: {"id", "ok": true, "distance": float | null}, null if there is no route.
+\n - next_hop: {"id", "ok": true, "next_hop": name | null}, the neighbor of the source to route to.
+\n - errors: {"id", "ok": false, "error": str}
+\nUsage: python server.py snapshot_folder [--tcp host:port | --unix path] (stdin/stdout by default)
+"""
+from argparse import ArgumentParser
+from json import dumps, loads
+import asyncio
+import sys
+
+from numpy import array, int64, isfinite
+
+from topology import Graph
+
+OPERATIONS = ("route", "distance", "next_hop")
+
+
+class RouteServer:
+    """
+    Answers the queries of every client with one batcher task: a query waits in the queue until the batcher
+    takes every pending query (up to max_batch) and answers them at once.
+    \nOptional Arguments:
+    \n - max_batch: int = 4096 -> Number of queries answered by one vectorized lookup.
+    \n - delay: float = 0.0005 -> Seconds waited for more queries before answering a batch that is not full.
+    \n - max_pending: int = 4 * max_batch -> Queries of one client waiting for their answer before it stops being read.
+    """
+
+    def __init__(self, graph: Graph, **kwargs):
+        if graph.routes is None:
+            raise ValueError(f"The snapshot of {graph.name} has no routing tables")
+        self.graph = graph
+        self.max_batch = kwargs.get("max_batch", 4096)
+        self.delay = kwargs.get("delay", 0.0005)
+        self.max_pending = kwargs.get("max_pending", 4 * self.max_batch)
+        self.queue = None
+        self.batcher = None
+
+    async def start(self):
+        self.queue = asyncio.Queue()
+        self.batcher = asyncio.create_task(self._run_batches())
+
+    async def stop(self):
+        self.batcher.cancel()
+        try:
+            await self.batcher
+        except asyncio.CancelledError:
+            pass
+
+    def _resolve(self, node) -> int:
+        """The index of a Node given by index, name or digit string, raises ValueError if it does not exist"""
+        if isinstance(node, str) and node.isdigit():
+            node = int(node)
+        if isinstance(node, bool) or not isinstance(node, int | str):
+            raise ValueError(f"The provided node type ({type(node).__name__}) is incorrect")
+        if isinstance(node, str):
+            index = self.graph.nodes.index.get(node)
+            if index is None:
+                raise ValueError(f"The provided Node name ({node}) does not exist")
+            return (index)
+        if not 0 <= node < self.graph.size:
+            raise ValueError(f"The provided Node index ({node}) does not exist")
+        return (node)
+
+    async def query(self, request: dict) -> dict:
+        """Validates a request, then waits for the batch answering it"""
+        answer = {"id": request.get("id") if isinstance(request, dict) else None}
+        try:
+            if not isinstance(request, dict):
+                raise ValueError("A request must be a JSON object")
+            if request.get("op") not in OPERATIONS:
+                raise ValueError(f"The provided operation ({request.get('op')}) does not exist")
+            pair = self._resolve(request.get("source")), self._resolve(request.get("destination"))
+        except ValueError as error:
+            return (answer | {"ok": False, "error": str(error)})
+        future = asyncio.get_running_loop().create_future()
+        await self.queue.put((request["op"], pair, future))
+        return (answer | {"ok": True} | await future)
+
+    async def _run_batches(self):
+        while True:
+            batch = [await self.queue.get()]
+            if self.queue.qsize() < self.max_batch and self.delay:
+                await asyncio.sleep(self.delay)  # Lets the clients send more queries
+            while len(batch) < self.max_batch and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                answers = self.answer([op for op, _, _ in batch], array([pair for _, pair, _ in batch], dtype=int64))
+            except Exception as error:  # A failed batch must not leave its clients waiting
+                answers = [{"ok": False, "error": str(error)}] * len(batch)
+            for (_, _, future), answer in zip(batch, answers):
+                if not future.done():
+                    future.set_result(answer)
+
+    def answer(self, operations: list, pairs) -> list:
+        """Answers a batch of queries given as operation names and a (k, 2) array of (source, destination)"""
+        graph = self.graph
+        names = graph.nodes.names
+        sources, destinations = pairs[:, 0], pairs[:, 1]
+        if graph.routes.compressed:  # Only the next hops are kept, the distances are summed along the routes
+            distances = graph.traceroute_many(sources, destinations)[1]
+        else:
+            distances = graph.routes.distance[sources, destinations].astype(float)
+            distances[sources == destinations] = 0
+        next_hops = graph.routes.next_hop[sources, destinations].tolist()
+        routed = [position for position, op in enumerate(operations) if op == "route"]
+        routes = {}
+        if routed:
+            _, _, nodes, offsets = graph.traceroute_many(sources[routed], destinations[routed], paths=True)
+            nodes, offsets = nodes.tolist(), offsets.tolist()
+            routes = {position: [names[node] for node in nodes[offsets[rank]:offsets[rank + 1]]]
+                      for rank, position in enumerate(routed)}
+
+        answers = []
+        for position, op in enumerate(operations):
+            distance = float(distances[position]) if isfinite(distances[position]) else None
+            match op:
+                case "route":
+                    answers.append({"route": routes[position], "distance": distance})
+                case "distance":
+                    answers.append({"distance": distance})
+                case "next_hop":
+                    answers.append({"next_hop": names[next_hops[position]] if next_hops[position] >= 0 else None})
+        return (answers)
+
+    async def _respond(self, line: bytes, write):
+        try:
+            request = loads(line)
+        except ValueError as error:
+            answer = {"id": None, "ok": False, "error": f"Invalid JSON: {error}"}
+        else:
+            answer = await self.query(request)
+        await write((dumps(answer) + "\n").encode())
+
+    async def handle(self, reader: asyncio.StreamReader, write):
+        """
+        Reads the JSON lines of one client, each query is answered as soon as its batch is done.
+        write is a coroutine function sending an answer, which waits while the client is not reading.
+        """
+        pending = set()
+        while line := await reader.readline():
+            if not line.strip():
+                continue
+            if len(pending) >= self.max_pending:  # Stop reading until the client reads its answers
+                await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            task = asyncio.create_task(self._respond(line, write))
+            pending.add(task)
+            task.add_done_callback(pending.discard)
+        if pending:
+            await asyncio.wait(pending)
+
+    async def handle_connection(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        async def write(data: bytes):
+            writer.write(data)
+            await writer.drain()
+        try:
+            await self.handle(reader, write)
+        except ConnectionError:  # The client left without reading its answers
+            pass
+        finally:
+            writer.close()
+
+    async def serve_stdio(self):
+        """Reads the queries from stdin and writes the answers to stdout, until stdin is closed"""
+        loop = asyncio.get_running_loop()
+        reader = asyncio.StreamReader()
+        await loop.connect_read_pipe(lambda: asyncio.StreamReaderProtocol(reader), sys.stdin)
+
+        async def write(data: bytes):  # Blocking: stdout is read by the parent process
+            sys.stdout.buffer.write(data)
+            sys.stdout.buffer.flush()
+        await self.handle(reader, write)
+
+
+async def serve(snapshot: str, **kwargs):
+    """
+    Loads the snapshot and serves it until interrupted, or until stdin is closed.
+    \nOptional Arguments:
+    \n - tcp: str "host:port" -> Listen on a TCP socket.
+    \n - unix: str -> Listen on a Unix socket.
+    \n - max_batch, delay, max_pending: see RouteServer.
+    """
+    server = RouteServer(Graph.load(snapshot, mmap=True, read_only=True), **kwargs)
+    await server.start()
+    try:
+        if tcp := kwargs.get("tcp"):
+            host, _, port = tcp.rpartition(":")
+            listener = await asyncio.start_server(server.handle_connection, host or "127.0.0.1", int(port))
+        elif unix := kwargs.get("unix"):
+            listener = await asyncio.start_unix_server(server.handle_connection, unix)
+        else:
+            await server.serve_stdio()
+            return
+        print(f"Serving {server.graph.name} on \033[96m{tcp or unix}\033[0m", file=sys.stderr)
+        async with listener:
+            await listener.serve_forever()
+    finally:
+        await server.stop()
+
+
+def main(arguments: list = None):
+    parser = ArgumentParser(description="JSON lines traceroute server over a Graph snapshot")
+    parser.add_argument("snapshot", help="Folder written by Graph.save, with its routing tables")
+    transport = parser.add_mutually_exclusive_group()
+    transport.add_argument("--tcp", help="host:port to listen on")
+    transport.add_argument("--unix", help="Unix socket path to listen on")
+    parser.add_argument("--max-batch", type=int, default=4096, help="Queries answered by one vectorized lookup")
+    parser.add_argument("--delay", type=float, default=0.0005, help="Seconds waited to fill a batch")
+    parser.add_argument("--max-pending", type=int, help="Unanswered queries per client (default: 4 x max-batch)")
+    args = parser.parse_args(arguments)
+    try:
+        asyncio.run(serve(args.snapshot, tcp=args.tcp, unix=args.unix, max_batch=args.max_batch, delay=args.delay,
+                          max_pending=args.max_pending or 4 * args.max_batch))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
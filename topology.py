@@ -0,0 +1,2255 @@
+"""
+Projet Graphes: the topology of a network of Tier 1, 2 and 3 operators, its connectivity and routing tables.
+This module is the library, projet_main.py is the command line interface.
+\nOnly NumPy is imported at load time: pandas (display_links), xlsxwriter, pyarrow (export), SciPy (routing)
+and the multiprocessing modules (parallel routing) are imported when they are used.
+"""
+from random import choice, randint, random, sample
+from numpy import array, arange, asarray, zeros, empty, full, fill_diagonal, inf, int8, int32, int64, float32, float64
+from numpy import ndarray, array_equal, bincount, concatenate, cumsum, diff, isclose, isfinite, isin, lexsort, minimum, nonzero
+from numpy import delete, eye, insert, maximum, ones, repeat, searchsorted, take_along_axis, tile, triu, unique, where
+from numpy import load as load_array, save as save_array, memmap
+from numpy.random import default_rng
+from collections.abc import Mapping
+from contextlib import contextmanager, nullcontext
+from cProfile import Profile
+from functools import wraps
+from heapq import heappop, heappush
+from io import StringIO
+from logging import getLogger, DEBUG
+from pstats import Stats
+from time import perf_counter
+from weakref import ref
+import tracemalloc
+from datetime import datetime
+from json import dump, load as load_json
+from operator import eq, ne, lt, le, gt, ge, index as operator_index
+from os import path, close, cpu_count, makedirs, remove
+from tempfile import mkstemp
+from sys import intern
+
+# Can use NetworkX for visualization
+
+
+def random_event(probability: int):
+    "The probability is an int indicating a percentage [probability%]"
+    return (random() < (probability / 100))
+
+
+def format_infinity(x):
+    """Used for readability when printing dataframes"""
+    if x == inf:
+        return '∞'
+    elif x == -inf:
+        return '-∞'
+    return x
+
+
+logger = getLogger("topology")  # Structured events: the extra fields hold an "event" name and its values
+
+COMPARISONS = {"==": eq, "!=": ne, "<": lt, "<=": le, ">": gt, ">=": ge}
+EXPORT_TABLES = ("matrix", "edges", "routing", "distances")
+COMPRESSED_ARRAYS = ("order", "default", "offsets", "starts", "stops", "hops")  # Arguments of CompressedNextHop
+DISTANCE_RTOL = 1e-6  # The distances are stored as float32: sums of them only match up to their rounding
+EXCEL_MAX_ROWS, EXCEL_MAX_COLUMNS = 1048576, 16384
+
+
+def proportional_rules(size: int, proportions: tuple = (0.1, 0.2, 0.7)) -> tuple:
+    """Splits size in Backbone, Transit and Regular Nodes following the proportions of the default rules (10, 20, 70)"""
+    backbone = max(1, round(size * proportions[0]))
+    transit = max(1, round(size * proportions[1]))
+    return ((backbone, transit, size - backbone - transit))
+
+
+def add_count(counters: dict, name: str, amount: int = 1):
+    counters[name] = counters.get(name, 0) + amount
+
+
+class Instrumentation:
+    """
+    Counters, timers and optional profiles of the hot paths of a Graph, off by default.
+    When disabled, count returns at once and the instrumented methods are called directly.
+    \n - counters: {name: int}, the amount of each operation.
+    \n - timers: {phase: [calls, seconds]}, nested phases are included in their parent.
+    \n - profile: str {None, cprofile, tracemalloc} -> Profiles every outermost phase:
+    cProfile statistics accumulated over its calls, or the peak of memory traced by tracemalloc.
+    """
+
+    PROFILERS = [None, "cprofile", "tracemalloc"]
+    PROFILE_LINES = 15
+
+    def __init__(self, enabled: bool = False, profile: str = None):
+        if profile not in self.PROFILERS:
+            raise ValueError(f"The provided profiler ({profile}) does not exist")
+        self.enabled = enabled
+        self.profile = profile
+        self.reset()
+
+    def reset(self):
+        self.counters = {}
+        self.timers = {}
+        self._profilers = {}  # {phase: Profile}
+        self._peaks = {}  # {phase: bytes}
+        self._depth = 0
+
+    def count(self, name: str, amount: int = 1):
+        if self.enabled:
+            add_count(self.counters, name, amount)
+
+    def phase(self, name: str):
+        """Context timing (and profiling) a phase, a null context when disabled"""
+        return (self._measure(name) if self.enabled else nullcontext())
+
+    @contextmanager
+    def _measure(self, name: str):
+        outermost = self._depth == 0  # Profilers cannot be nested
+        self._depth += 1
+        profiler = tracing = None
+        if outermost and self.profile == "cprofile":
+            profiler = self._profilers.setdefault(name, Profile())
+            profiler.enable()
+        elif outermost and self.profile == "tracemalloc":
+            tracing = not tracemalloc.is_tracing()
+            if tracing:
+                tracemalloc.start()
+            tracemalloc.reset_peak()
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            seconds = perf_counter() - start
+            self._depth -= 1
+            if profiler is not None:
+                profiler.disable()
+            if tracing is not None:
+                self._peaks[name] = max(self._peaks.get(name, 0), tracemalloc.get_traced_memory()[1])
+                if tracing:
+                    tracemalloc.stop()
+            timer = self.timers.setdefault(name, [0, 0.0])
+            timer[0] += 1
+            timer[1] += seconds
+            logger.debug("Phase %s took %.6fs", name, seconds, extra={"event": "phase", "phase": name, "seconds": seconds})
+
+    def stats(self) -> dict:
+        """Returns a copy of the counters, timers and profiles, the cProfile ones formatted as text"""
+        profiles = {name: {"peak_bytes": peak} for name, peak in self._peaks.items()}
+        for name, profiler in self._profilers.items():
+            stream = StringIO()
+            Stats(profiler, stream=stream).sort_stats("cumulative").print_stats(self.PROFILE_LINES)
+            profiles[name] = {"cprofile": stream.getvalue()}
+        return ({"enabled": self.enabled, "profile": self.profile, "counters": dict(self.counters),
+                 "timers": {name: {"calls": calls, "seconds": seconds} for name, (calls, seconds) in self.timers.items()},
+                 "profiles": profiles})
+
+
+def instrumented(phase: str):
+    """Decorator timing a Graph method as a phase of its Instrumentation"""
+    def decorator(method):
+        @wraps(method)
+        def wrapper(self, *args, **kwargs):
+            if not self.instrumentation.enabled:
+                return (method(self, *args, **kwargs))
+            with self.instrumentation.phase(phase):
+                return (method(self, *args, **kwargs))
+        return (wrapper)
+    return (decorator)
+
+
+def build_csr(size: int, node_A, node_B, weights):
+    """
+    Builds symmetric CSR arrays (indptr, indices, weights) from the upper half edges of a Graph.
+    \nEvery edge is stored in both directions so the neighbors of a Node are a single slice.
+    """
+    source = concatenate([node_A, node_B]).astype(int64)
+    target = concatenate([node_B, node_A]).astype(int32)
+    order = lexsort((target, source))
+    indptr = zeros(size + 1, dtype=int64)
+    cumsum(bincount(source, minlength=size), out=indptr[1:])
+    return (indptr, target[order], concatenate([weights, weights]).astype(float64)[order])
+
+
+class DenseAdjacency:
+    """
+    Upper half adjacency matrix, excluding the diagonal which is set to infinity.
+    \nFast and simple, but it uses size² floats: only use it for small Graphs.
+    \nA per-Node index {neighbor: weight} is kept in sync with the matrix so neighbors cost O(degree).
+    \nThe CSR arrays are built once and cached: a weight change is written in place in both directions,
+    a created or removed link is inserted or deleted in its two rows, which costs O(links) instead of O(size²).
+    """
+
+    kind = "dense"
+
+    def __init__(self, size: int):
+        self.size = size
+        self.matrix = zeros((size, size))
+        fill_diagonal(self.matrix, inf)
+        self.degree = zeros(size, dtype=int32)
+        self._rows = [{} for _ in range(size)]
+        self._csr = None
+
+    @classmethod
+    def from_edges(cls, size: int, node_A, node_B, weights):
+        """Builds the matrix from upper half edges without duplicates (node_A < node_B)"""
+        temp = cls(size)
+        temp.matrix[node_A, node_B] = weights
+        for a, b, weight in zip(node_A.tolist(), node_B.tolist(), weights.tolist()):
+            temp._rows[a][b] = temp._rows[b][a] = weight
+        temp.degree[:] = bincount(concatenate([node_A, node_B]), minlength=size)
+        return (temp)
+
+    def __getitem__(self, key):
+        node_A, node_B = key
+        return (self.matrix[(node_A, node_B) if node_A <= node_B else (node_B, node_A)])
+
+    def __setitem__(self, key, value):
+        node_A, node_B = key
+        if node_A == node_B:
+            return
+        if node_A > node_B:
+            node_A, node_B = node_B, node_A
+        previous = self.matrix[node_A, node_B]
+        self.matrix[node_A, node_B] = value
+        if value != 0:
+            self._rows[node_A][node_B] = self._rows[node_B][node_A] = value
+        else:
+            self._rows[node_A].pop(node_B, None)
+            self._rows[node_B].pop(node_A, None)
+        if (previous == 0) != (value == 0):
+            self.degree[[node_A, node_B]] += 1 if value != 0 else -1
+        if self._csr is not None and (previous != 0 or value != 0):
+            self._patch_csr(node_A, node_B, previous, value)
+
+    def _patch_csr(self, node_A: int, node_B: int, previous: float, value: float):
+        """Writes the change of the link (node_A, node_B) into the cached CSR arrays, in both directions"""
+        indptr, indices, weights = self._csr
+        # node_A < node_B: the position of (node_A, node_B) comes first in the arrays
+        positions = [indptr[source] + searchsorted(indices[indptr[source]:indptr[source + 1]], target)
+                     for source, target in ((node_A, node_B), (node_B, node_A))]
+        if previous != 0 and value != 0:
+            weights[positions] = value
+            return
+        indptr = indptr.copy()  # The arrays returned before stay consistent with each other
+        if value != 0:
+            indices = insert(indices, positions, array([node_B, node_A], dtype=indices.dtype))
+            weights = insert(weights, positions, value)
+            indptr[node_A + 1:] += 1
+            indptr[node_B + 1:] += 1
+        else:
+            indices, weights = delete(indices, positions), delete(weights, positions)
+            indptr[node_A + 1:] -= 1
+            indptr[node_B + 1:] -= 1
+        self._csr = (indptr, indices, weights)
+
+    def neighbors(self, node: int):
+        """Returns the (indices, weights) of the neighbors of a Node"""
+        row = sorted(self._rows[node].items())
+        return (array([index for index, _ in row], dtype=int32), array([weight for _, weight in row], dtype=float64))
+
+    def edges(self):
+        """Returns the upper half edges as three arrays (node_A, node_B, weights)"""
+        node_A, node_B = nonzero(triu(self.matrix, 1))
+        return (node_A, node_B, self.matrix[node_A, node_B])
+
+    def csr(self):
+        """Returns the CSR arrays (indptr, indices, weights) of the matrix, cached until a link is created or removed"""
+        if self._csr is None:
+            self._csr = build_csr(self.size, *self.edges())
+        return (self._csr)
+
+    def rows(self, start: int, stop: int):
+        """Returns the rows [start, stop) of the upper half matrix"""
+        return (self.matrix[start:stop])
+
+    def to_dense(self):
+        return (self.matrix)
+
+
+class SparseAdjacency:
+    """
+    Compressed sparse row (CSR) adjacency, made of the arrays indptr, indices and weights.
+    \nEach edge is stored in both directions and each row is sorted by index.
+    New links are buffered and merged into the arrays the next time the whole arrays are read,
+    so a Graph with millions of Nodes but only a few links per Node fits in memory.
+    \nThe buffered links are also indexed per Node, so neighbors always cost O(degree).
+    """
+
+    kind = "sparse"
+
+    def __init__(self, size: int):
+        self.size = size
+        self.degree = zeros(size, dtype=int32)
+        self._indptr = zeros(size + 1, dtype=int64)
+        self._indices = empty(0, dtype=int32)
+        self._weights = empty(0, dtype=float64)
+        self._pending = {}  # {(node_A, node_B): value} with node_A < node_B, 0 removes a link
+        self._pending_rows = {}  # {node: {neighbor: value}}, both directions of self._pending
+
+    @classmethod
+    def from_edges(cls, size: int, node_A, node_B, weights):
+        """Builds the CSR arrays from upper half edges without duplicates (node_A < node_B)"""
+        return (cls.from_csr(size, *build_csr(size, node_A, node_B, weights)))
+
+    @classmethod
+    def from_csr(cls, size: int, indptr, indices, weights):
+        """Uses existing symmetric CSR arrays as they are, memory mapped ones included"""
+        temp = cls(size)
+        temp._indptr, temp._indices, temp._weights = indptr, indices, weights
+        temp.degree[:] = diff(indptr)
+        return (temp)
+
+    def __getitem__(self, key):
+        node_A, node_B = key
+        if node_A == node_B:
+            return (inf)
+        if node_A > node_B:
+            node_A, node_B = node_B, node_A
+        if (node_A, node_B) in self._pending:
+            return (self._pending[(node_A, node_B)])
+        position = self._find(node_A, node_B)
+        return (self._weights[position] if position is not None else 0.0)
+
+    def __setitem__(self, key, value):
+        node_A, node_B = key
+        if node_A == node_B:
+            return
+        if node_A > node_B:
+            node_A, node_B = node_B, node_A
+        value, previous = float64(value), self[(node_A, node_B)]
+        position = self._find(node_A, node_B)
+        if value != 0 and position is not None and (node_A, node_B) not in self._pending:
+            # Existing link, the weight is updated in place in both directions
+            self._weights[position] = value
+            self._weights[self._find(node_B, node_A)] = value
+        else:
+            self._pending[(node_A, node_B)] = value
+            self._pending_rows.setdefault(node_A, {})[node_B] = value
+            self._pending_rows.setdefault(node_B, {})[node_A] = value
+        if (previous == 0) != (value == 0):
+            self.degree[[node_A, node_B]] += 1 if value != 0 else -1
+
+    def _find(self, node_A: int, node_B: int):
+        """Returns the position of the edge (node_A, node_B) in the CSR arrays, None if it's absent"""
+        start, end = self._indptr[node_A], self._indptr[node_A + 1]
+        position = start + searchsorted(self._indices[start:end], node_B)
+        if position < end and self._indices[position] == node_B:
+            return (position)
+        return (None)
+
+    def _compile(self):
+        """Merges the buffered links into the CSR arrays"""
+        if not self._pending:
+            return
+        node_A, node_B, weights = self.edges(compile=False)
+        keys = array(list(self._pending.keys()), dtype=int64).reshape(-1, 2)
+        values = array(list(self._pending.values()), dtype=float64)
+        kept = ~isin(node_A * self.size + node_B, keys[:, 0] * self.size + keys[:, 1])
+        added = values != 0
+        self._indptr, self._indices, self._weights = build_csr(
+            self.size,
+            concatenate([node_A[kept], keys[added, 0]]),
+            concatenate([node_B[kept], keys[added, 1]]),
+            concatenate([weights[kept], values[added]]),
+        )
+        self._pending = {}
+        self._pending_rows = {}
+
+    def neighbors(self, node: int):
+        """Returns the (indices, weights) of the neighbors of a Node"""
+        start, end = self._indptr[node], self._indptr[node + 1]
+        indices, weights = self._indices[start:end], self._weights[start:end]
+        if node not in self._pending_rows:
+            return (indices, weights)
+        # Merge the CSR row with the buffered links of this Node only
+        row = dict(zip(indices.tolist(), weights.tolist()))
+        row.update(self._pending_rows[node])
+        row = sorted((index, weight) for index, weight in row.items() if weight != 0)
+        return (array([index for index, _ in row], dtype=int32), array([weight for _, weight in row], dtype=float64))
+
+    def edges(self, compile: bool = True):
+        """Returns the upper half edges as three arrays (node_A, node_B, weights)"""
+        if compile:
+            self._compile()
+        source = repeat(arange(self.size, dtype=int64), diff(self._indptr))
+        upper = source < self._indices
+        return (source[upper], self._indices[upper].astype(int64), self._weights[upper])
+
+    def csr(self):
+        """Returns the CSR arrays (indptr, indices, weights)"""
+        self._compile()
+        return (self._indptr, self._indices, self._weights)
+
+    def rows(self, start: int, stop: int):
+        """Returns the rows [start, stop) of the equivalent upper half matrix, see DenseAdjacency"""
+        self._compile()
+        temp = zeros((stop - start, self.size))
+        temp[arange(stop - start), arange(start, stop)] = inf
+        first, last = self._indptr[start], self._indptr[stop]
+        source = repeat(arange(start, stop), diff(self._indptr[start:stop + 1]))
+        upper = source < self._indices[first:last]
+        temp[source[upper] - start, self._indices[first:last][upper]] = self._weights[first:last][upper]
+        return (temp)
+
+    def to_dense(self):
+        """Returns the equivalent DenseAdjacency matrix, only use it for small Graphs"""
+        matrix = DenseAdjacency(self.size).matrix
+        node_A, node_B, weights = self.edges()
+        matrix[node_A, node_B] = weights
+        return (matrix)
+
+
+def routing_rows(indptr, indices, weights, sources, distance=None, predecessor=None, counters=None):
+    """
+    Computes the rows of the distance and next hop matrices for the given sources, over CSR arrays.
+    \nIf the distances are not provided, they are computed with a batched Bellman-Ford:
+    each pass relaxes every link for every source at once (a min-plus product), until nothing improves.
+    \nThe next hop is the first neighbor of the source on a shortest path, -1 if there is none.
+    It is found by pointer jumping over the predecessors, which are derived from the distances if not provided.
+    \nIf counters is a dict, the passes, relaxations and pointer jumps are added to it.
+    """
+    size, count = len(indptr) - 1, len(sources)
+    columns = arange(count)
+    # The work is done on (size x count) arrays so gathering the neighbors copies contiguous rows
+    if distance is None:
+        distance = full((size, count), inf)
+        distance[sources, columns] = 0
+        compute = True
+    else:
+        distance = distance.T.copy()
+        compute = False
+    if len(indices) == 0:
+        return (distance.T, full((count, size), -1, dtype=int32))
+
+    degree = diff(indptr)
+    linked = nonzero(degree)[0]
+    starts = indptr[linked]
+    owner = repeat(arange(size), degree)
+    weights = weights[:, None]
+    active = ones(size, dtype=bool)  # Only the links leaving a Node improved by the last pass are relaxed
+    while compute:
+        edges = nonzero(active[indices])[0]
+        targets, edge_starts = unique(owner[edges], return_index=True)
+        best = minimum.reduceat(distance[indices[edges]] + weights[edges], edge_starts, axis=0)
+        if counters is not None:
+            add_count(counters, "bellman_passes")
+            add_count(counters, "bellman_relaxations", len(edges) * count)
+        improved = best < distance[targets]
+        distance[targets] = where(improved, best, distance[targets])
+        active[:] = False
+        active[targets[improved.any(axis=1)]] = True
+        compute = active.any()
+
+    if predecessor is None:
+        # Predecessor of each Node: the first neighbor through which the shortest distance is reached
+        # Floyd-Warshall adds the weights in another order than the routes: the sums only match up to rounding
+        tight = isclose(distance[indices] + weights, distance[owner], rtol=DISTANCE_RTOL, atol=0)
+        first = minimum.reduceat(where(tight, arange(len(indices))[:, None], len(indices)), starts, axis=0)
+        predecessor = full((size, count), -1, dtype=int64)
+        predecessor[linked] = where(first < len(indices), indices[minimum(first, len(indices) - 1)], -1)
+    else:
+        predecessor = predecessor.T.astype(int64)
+    predecessor[~isfinite(distance)] = -1
+    predecessor[sources, columns] = -1
+
+    # Pointer jumping: follow the predecessors until the Node right after the source
+    jump = where((predecessor == sources) | (predecessor < 0), arange(size)[:, None], predecessor)
+    while True:
+        following = take_along_axis(jump, jump, axis=0)
+        if counters is not None:
+            add_count(counters, "pointer_jumps")
+        if array_equal(following, jump):
+            break
+        jump = following
+    next_hop = where(predecessor >= 0, jump, -1).astype(int32)
+    return (distance.T, next_hop.T)
+
+
+def floyd_warshall(indptr, indices, weights):
+    """All pairs distances with a NumPy vectorized Floyd-Warshall, O(size³): only for small Graphs"""
+    size = len(indptr) - 1
+    distance = full((size, size), inf)
+    distance[repeat(arange(size), diff(indptr)), indices] = weights
+    fill_diagonal(distance, 0)
+    for step in range(size):
+        minimum(distance, distance[:, step, None] + distance[step], out=distance)
+    return (distance)
+
+
+def scipy_shortest_paths(indptr, indices, weights, sources):
+    """(distances, predecessors) computed by SciPy's compiled Dijkstra, raises ImportError if SciPy is not installed"""
+    from scipy.sparse import csr_matrix
+    from scipy.sparse.csgraph import dijkstra
+
+    size = len(indptr) - 1
+    matrix = csr_matrix((weights, indices, indptr), shape=(size, size))
+    return (dijkstra(matrix, indices=sources, return_predecessors=True))
+
+
+def share_array(source):
+    """
+    Copies an array into a new shared memory block, so worker processes can read it without pickling.
+    \nReturns the SharedMemory (to close and unlink) and the spec (name, shape, dtype) used by attach_array.
+    """
+    from multiprocessing.shared_memory import SharedMemory
+
+    block = SharedMemory(create=True, size=max(1, source.nbytes))
+    ndarray(source.shape, dtype=source.dtype, buffer=block.buf)[...] = source
+    return (block, (block.name, source.shape, source.dtype.str))
+
+
+def attach_array(spec):
+    """Opens an array shared with share_array, returns the SharedMemory (to close) and the array"""
+    from multiprocessing.shared_memory import SharedMemory
+
+    name, shape, dtype = spec
+    block = SharedMemory(name=name)  # Workers share the resource tracker of the creator, which unlinks it
+    return (block, ndarray(shape, dtype=dtype, buffer=block.buf))
+
+
+def mapped_array(shape: tuple, dtype):
+    """
+    Creates an uninitialized array backed by a new temporary file, that worker processes open with open_mapped
+    and write in place. The file is in /dev/shm where it exists, so its pages stay in memory.
+    \nReturns the array and the spec (file name, shape, dtype), see release_mapped once the workers are done.
+    """
+    descriptor, name = mkstemp(prefix="routing_", suffix=".bin", dir="/dev/shm" if path.isdir("/dev/shm") else None)
+    close(descriptor)
+    mapped = memmap(name, dtype=dtype, mode="w+", shape=shape)
+    return (mapped, (name, shape, mapped.dtype.str))
+
+
+def open_mapped(spec):
+    """Opens an array created by mapped_array, writes are seen by every process mapping it"""
+    name, shape, dtype = spec
+    return (memmap(name, dtype=dtype, mode="r+", shape=shape))
+
+
+def release_mapped(spec):
+    """
+    Removes the file of an array created by mapped_array: the memory stays mapped until the array is freed.
+    Windows cannot remove a mapped file, it's then left in the temporary folder.
+    """
+    try:
+        remove(spec[0])
+    except OSError:
+        pass
+
+
+def routing_worker(specs: dict, outputs: dict, method: str, start: int, stop: int, counting: bool = False):
+    """
+    Worker process: fills the rows [start, stop) of the next_hop and distance matrices mapped by the parent.
+    specs are the CSR arrays, see share_array, outputs the matrices, see mapped_array.
+    Returns its operation counters if counting, None otherwise.
+    """
+    blocks, arrays = {}, {}
+    counters = {} if counting else None
+    for key, spec in specs.items():
+        blocks[key], arrays[key] = attach_array(spec)
+    for key, spec in outputs.items():
+        arrays[key] = open_mapped(spec)
+    try:
+        RoutingTables.fill(arrays["indptr"], arrays["indices"], arrays["weights"], method,
+                           arrays["next_hop"], arrays["distance"], arange(start, stop), counters)
+    finally:
+        arrays.clear()
+        for block in blocks.values():
+            block.close()
+    return (counters)
+
+
+def link_keys(indptr, indices):
+    """The sorted keys source * size + target of the CSR links (rows hold sorted indices), see link_weights"""
+    size = len(indptr) - 1
+    return (repeat(arange(size, dtype=int64), diff(indptr)) * size + indices)
+
+
+def link_weights(indptr, indices, weights, node_A, node_B, keys=None):
+    """The weights of the links (node_A[i], node_B[i]) read from CSR arrays, 0 if there is no link"""
+    size = len(indptr) - 1
+    keys = link_keys(indptr, indices) if keys is None else keys
+    wanted = asarray(node_A, dtype=int64) * size + asarray(node_B, dtype=int64)
+    position = minimum(searchsorted(keys, wanted), max(0, len(keys) - 1))
+    return (where((len(keys) > 0) & (keys[position] == wanted), weights[position] if len(keys) else 0, 0))
+
+
+def shortest_path(indptr, indices, weights, source: int, target: int, blocked_nodes=(), blocked_links=()):
+    """
+    Dijkstra from source to target over CSR arrays, stopping as soon as target is reached.
+    Only the rows of the visited Nodes are read, so a short route costs little even on a large Graph.
+    \nblocked_nodes: set of Nodes that cannot be visited, blocked_links: set of (node_A, node_B) that cannot be used.
+    \nReturns (total weight, [nodes]), (inf, []) if target cannot be reached.
+    """
+    distance, parent = {source: 0.0}, {source: -1}
+    heap = [(0.0, source)]
+    while heap:
+        current_distance, node = heappop(heap)
+        if node == target:
+            route = [node]
+            while parent[route[-1]] >= 0:
+                route.append(parent[route[-1]])
+            return ((current_distance, route[::-1]))
+        if current_distance > distance[node]:
+            continue
+        start, stop = indptr[node], indptr[node + 1]
+        for neighbor, weight in zip(indices[start:stop].tolist(), weights[start:stop].tolist()):
+            if neighbor in blocked_nodes or (node, neighbor) in blocked_links:
+                continue
+            candidate = current_distance + weight
+            if candidate < distance.get(neighbor, inf):
+                distance[neighbor] = candidate
+                parent[neighbor] = node
+                heappush(heap, (candidate, neighbor))
+    return ((inf, []))
+
+
+def k_shortest_paths(indptr, indices, weights, source: int, target: int, k: int):
+    """
+    Yen's algorithm over CSR arrays: the k shortest loopless routes from source to target, shortest first.
+    Each new route deviates from a previous one at a spur Node, found by shortest_path with the links
+    already used by the routes sharing the same beginning removed.
+    \nReturns [(total weight, [nodes]), ], fewer than k if there are not as many routes.
+    """
+    first = shortest_path(indptr, indices, weights, source, target)
+    if not first[1]:
+        return ([])
+    keys = link_keys(indptr, indices)
+    routes, candidates, seen = [first], [], {tuple(first[1])}
+    while len(routes) < k:
+        previous = routes[-1][1]
+        costs = cumsum(concatenate([[0.0], link_weights(indptr, indices, weights, previous[:-1], previous[1:], keys)]))
+        for position in range(len(previous) - 1):
+            root = previous[:position + 1]
+            blocked_links = {(route[position], route[position + 1]) for _, route in routes if route[:position + 1] == root}
+            spur_cost, spur = shortest_path(indptr, indices, weights, root[-1], target, set(root[:-1]), blocked_links)
+            if spur and tuple(root[:-1] + spur) not in seen:
+                seen.add(tuple(root[:-1] + spur))
+                heappush(candidates, (float(costs[position]) + spur_cost, root[:-1] + spur))
+        if not candidates:
+            break
+        routes.append(heappop(candidates))
+    return (routes)
+
+
+class EqualCostHops:
+    """
+    The other next hops of the (source, destination) pairs reached by several shortest paths (ECMP),
+    the first next hop staying in RoutingTables.next_hop. Only the pairs with ties are stored.
+    \n - keys: int64 -> sorted source * size + destination of the pairs with ties.
+    \n - offsets: int64 -> the other next hops of keys[i] are hops[offsets[i]:offsets[i + 1]].
+    \n - hops: int32
+    """
+
+    BATCH_ELEMENTS = 1 << 24  # Bounds the (links of a batch of sources x size) comparisons
+
+    def __init__(self, size: int, keys, offsets, hops):
+        self.size = size
+        self.keys = keys
+        self.offsets = offsets
+        self.hops = hops
+
+    @classmethod
+    def compute(cls, indptr, indices, weights, distance, next_hop):
+        """
+        A neighbor is an equal-cost next hop of (source, destination) if the link to it plus its distance
+        to the destination equals the distance of the source, up to DISTANCE_RTOL. Every link of a batch of sources
+        is compared to every destination at once, the cost is about one pass of the batched Bellman-Ford.
+        """
+        size = len(indptr) - 1
+        keys, hops = [empty(0, dtype=int64)], [empty(0, dtype=int32)]
+        for start, stop in cls._batches(diff(indptr), max(1, cls.BATCH_ELEMENTS // max(1, size))):
+            links = arange(indptr[start], indptr[stop])
+            owner = repeat(arange(start, stop), diff(indptr[start:stop + 1]))
+            neighbor = indices[links]
+            tight = isclose(distance[neighbor].astype(float64) + weights[links, None], distance[owner],
+                            rtol=DISTANCE_RTOL, atol=0)
+            tight &= isfinite(distance[owner])
+            tight &= next_hop[owner] != neighbor[:, None]  # The first next hop is already stored
+            link, destination = nonzero(tight)
+            keys.append(owner[link].astype(int64) * size + destination)
+            hops.append(neighbor[link].astype(int32))
+        return (cls.from_pairs(size, concatenate(keys), concatenate(hops)))
+
+    @classmethod
+    def from_pairs(cls, size: int, keys, hops, ordered: bool = False):
+        """
+        Builds the tables from one (source * size + destination, hop) item per other next hop,
+        in any order unless ordered (already sorted by key, then hop).
+        """
+        if not ordered:
+            order = lexsort((hops, keys))
+            keys, hops = keys[order], hops[order]
+        starts = nonzero(concatenate([[True], keys[1:] != keys[:-1]]))[0] if len(keys) else empty(0, dtype=int64)
+        return (cls(size, keys[starts], concatenate([starts, [len(keys)]]).astype(int64), hops))
+
+    @staticmethod
+    def _member(values, ordered):
+        """Whether each value is in the sorted array ordered, without sorting values"""
+        if len(ordered) == 0:
+            return (zeros(len(values), dtype=bool))
+        return (ordered[minimum(searchsorted(ordered, values), len(ordered) - 1)] == values)
+
+    @staticmethod
+    def _batches(degree, per_batch: int):
+        """(start, stop) of consecutive items whose degrees add up to about per_batch, at least one item each"""
+        ends = cumsum(degree)
+        cuts = searchsorted(ends, arange(per_batch, ends[-1] if len(ends) else 0, per_batch), side="right")
+        bounds = unique(concatenate([[0], cuts, [len(degree)]])).tolist()
+        return (zip(bounds[:-1], bounds[1:]))
+
+    @staticmethod
+    def _tight(distance, next_hop, sources, destinations, hops, weights):
+        """Whether hops[i], linked to sources[i] by weights[i], is another equal-cost next hop to destinations[i]"""
+        total = distance[sources, destinations]
+        tight = isclose(distance[hops, destinations].astype(float64) + weights, total, rtol=DISTANCE_RTOL, atol=0)
+        return (tight & isfinite(total) & (next_hop[sources, destinations] != hops))
+
+    def update(self, indptr, indices, weights, distance, next_hop, sources, destinations, node_A: int, node_B: int):
+        """
+        Returns the tables after the (sources[i], destinations[i]) pairs changed distance or next hop
+        and the link (node_A, node_B) changed, the CSR arrays included. Only what these changes can reach is tested:
+        \n - Every link of the changed pairs.
+        \n - The link from each neighbor to the source of a changed pair, for the same destination.
+        \n - The changed link, from both ends and for every destination.
+        \nThe cost follows the damage, not the size of the tables.
+        """
+        size = self.size
+        changed = unique(asarray(sources, dtype=int64) * size + asarray(destinations, dtype=int64))
+        sources, destinations = changed // size, changed % size
+        degree = diff(indptr)[sources]
+        new_keys, new_hops = [empty(0, dtype=int64)], [empty(0, dtype=int32)]
+        for start, stop in self._batches(degree, self.BATCH_ELEMENTS):
+            count = degree[start:stop]
+            pair = repeat(arange(start, stop), count)
+            links = arange(count.sum()) - repeat(cumsum(count) - count, count) + repeat(indptr[sources[start:stop]], count)
+            neighbor = indices[links].astype(int64)
+            # Every link of the changed pairs
+            tight = self._tight(distance, next_hop, sources[pair], destinations[pair], neighbor, weights[links])
+            new_keys.append(changed[pair[tight]])
+            new_hops.append(neighbor[tight].astype(int32))
+            # The link from each neighbor back to the source, the pairs of the neighbors changed themselves are done above
+            keys = neighbor * size + destinations[pair]
+            tight = self._tight(distance, next_hop, neighbor, destinations[pair], sources[pair], weights[links])
+            tight &= ~self._member(keys, changed)
+            new_keys.append(keys[tight])
+            new_hops.append(sources[pair[tight]].astype(int32))
+
+        keys = repeat(self.keys, diff(self.offsets))
+        kept = ~repeat(self._member(self.keys, changed), diff(self.offsets))
+        kept &= ~self._member(self.hops.astype(int64) * size + keys % size, changed)
+        value = link_weights(indptr, indices, weights, [node_A, node_B], [node_B, node_A])
+        for source, hop, weight in ((node_A, node_B, value[0]), (node_B, node_A, value[1])):
+            kept &= (keys // size != source) | (self.hops != hop)
+            if weight == 0:
+                continue
+            everywhere = arange(size, dtype=int64)
+            tight = self._tight(distance, next_hop, full(size, source), everywhere, full(size, hop), weight)
+            # Skips the pairs done above: changed, or whose hop is the source of a changed pair
+            tight &= ~self._member(source * size + everywhere, changed) & ~self._member(hop * size + everywhere, changed)
+            new_keys.append(source * size + nonzero(tight)[0].astype(int64))
+            new_hops.append(full(int(tight.sum()), hop, dtype=int32))
+        # The kept items are still sorted, the few new ones are sorted and inserted among them
+        new_keys, new_hops = concatenate(new_keys), concatenate(new_hops)
+        order = lexsort((new_hops, new_keys))
+        new_keys, new_hops = new_keys[order], new_hops[order]
+        keys, hops = keys[kept], self.hops[kept]
+        positions = searchsorted(keys * size + hops, new_keys * size + new_hops)
+        return (self.from_pairs(size, insert(keys, positions, new_keys), insert(hops, positions, new_hops), ordered=True))
+
+    @property
+    def nbytes(self) -> int:
+        return (self.keys.nbytes + self.offsets.nbytes + self.hops.nbytes)
+
+    def extra(self, sources, destinations):
+        """
+        The other next hops of the pairs (sources[i], destinations[i]),
+        as two arrays (i, hop) holding one row per other next hop.
+        """
+        wanted = asarray(sources, dtype=int64) * self.size + asarray(destinations, dtype=int64)
+        if len(self.keys) == 0:
+            return ((empty(0, dtype=int64), empty(0, dtype=int32)))
+        position = minimum(searchsorted(self.keys, wanted), len(self.keys) - 1)
+        pair = nonzero(self.keys[position] == wanted)[0]
+        first, count = self.offsets[position[pair]], diff(self.offsets)[position[pair]]
+        hop = arange(count.sum()) - repeat(cumsum(count) - count, count) + repeat(first, count)
+        return ((repeat(pair, count), self.hops[hop]))
+
+
+class CompressedNextHop:
+    """
+    A next hop matrix compressed row by row, for large tiered Graphs where most routes of a source
+    leave through the same neighbor. Each source keeps a default next hop (its most frequent one) and the runs of
+    destinations routed elsewhere. The destinations are numbered in the depth first order of a shortest path tree,
+    so the Nodes behind the same neighbor are contiguous and the exceptions come in few long runs.
+    The tiers are not grouped: numbering the destinations tier by tier splits these subtrees into more runs.
+    \n - order: int32 -> order[destination] is the position of the destination in the runs.
+    \n - default: int32 -> default[source] is the next hop of every destination outside the runs of source.
+    \n - offsets: int64 -> the runs of a source are [offsets[source], offsets[source + 1]).
+    \n - starts, stops, hops: int32 -> the destinations at the positions [start, stop) are routed to hop.
+    \nIt's indexed like the next hop matrix: [sources, destinations] searches the runs of each source in O(log k),
+    [rows] decompresses whole rows.
+    """
+
+    def __init__(self, order, default, offsets, starts, stops, hops):
+        self.order = order
+        self.default = default
+        self.offsets = offsets
+        self.starts = starts
+        self.stops = stops
+        self.hops = hops
+        self.size = len(default)
+        self.shape = (self.size, self.size)
+
+    @staticmethod
+    def tree_order(indptr, indices, weights, root: int = 0):
+        """
+        The position of every Node in a depth first walk of the shortest path tree of root.
+        The Nodes that root cannot reach come last.
+        """
+        size = len(indptr) - 1
+        distance, _ = routing_rows(indptr, indices, weights, array([root]))
+        distance = distance[0]
+        owner = repeat(arange(size), diff(indptr))
+        tight = (isfinite(distance[owner]) & (owner != root)
+                 & isclose(distance[indices] + weights, distance[owner], rtol=DISTANCE_RTOL, atol=0))
+        parent = full(size, -1, dtype=int64)
+        parent[owner[tight][::-1]] = indices[tight][::-1]  # The first tight neighbor of each Node
+        children_order = lexsort((arange(size), parent))
+        first_child = searchsorted(parent[children_order], arange(size))
+        child_count = bincount(parent[parent >= 0], minlength=size)
+
+        order = full(size, -1, dtype=int32)
+        position = 0
+        stack = [root]
+        while stack:
+            node = stack.pop()
+            order[node] = position
+            position += 1
+            start = first_child[node]
+            stack.extend(children_order[start:start + child_count[node]][::-1].tolist())
+        unreached = order < 0
+        order[unreached] = arange(position, size, dtype=int32)[:int(unreached.sum())]
+        return (order)
+
+    @classmethod
+    def from_rows(cls, size: int, order, blocks):
+        """Compresses blocks of consecutive rows given as (first row, rows), so the whole matrix never has to exist"""
+        nodes = empty(size, dtype=int64)
+        nodes[order] = arange(size)  # nodes[position] is the destination at this position
+        default = empty(size, dtype=int32)
+        counts = zeros(size, dtype=int64)
+        starts, stops, hops = [], [], []
+        for first, rows in blocks:
+            count = len(rows)
+            rows = asarray(rows)[:, nodes]
+            # The most frequent value of each row, -1 included
+            keys = (rows.astype(int64) + 1) + arange(count)[:, None] * (size + 1)
+            default[first:first + count] = bincount(keys.ravel(), minlength=count * (size + 1)).reshape(count, size + 1).argmax(axis=1) - 1
+            exception = rows != default[first:first + count, None]
+            changes = ones(rows.shape, dtype=bool)
+            changes[:, 1:] = rows[:, 1:] != rows[:, :-1]
+            run_rows, run_starts = nonzero(exception & changes)
+            ends = ones(rows.shape, dtype=bool)
+            ends[:, :-1] = changes[:, 1:]
+            _, run_ends = nonzero(exception & ends)
+            counts[first:first + count] = bincount(run_rows, minlength=count)
+            starts.append(run_starts.astype(int32))
+            stops.append((run_ends + 1).astype(int32))
+            hops.append(rows[run_rows, run_starts].astype(int32))
+        offsets = zeros(size + 1, dtype=int64)
+        cumsum(counts, out=offsets[1:])
+        empty_runs = [empty(0, dtype=int32)]
+        return (cls(order, default, offsets, concatenate(starts + empty_runs), concatenate(stops + empty_runs),
+                    concatenate(hops + empty_runs)))
+
+    @classmethod
+    def from_matrix(cls, next_hop, order, chunk_rows: int = 256):
+        size = len(next_hop)
+        return (cls.from_rows(size, order, ((first, next_hop[first:first + chunk_rows]) for first in range(0, size, chunk_rows))))
+
+    @property
+    def nbytes(self) -> int:
+        return (sum(value.nbytes for value in (self.order, self.default, self.offsets, self.starts, self.stops, self.hops)))
+
+    def __len__(self) -> int:
+        return (self.size)
+
+    def __getitem__(self, key):
+        if isinstance(key, tuple):
+            return (self.lookup(*key))
+        return (self.rows(arange(self.size)[key]))
+
+    def lookup(self, sources, destinations):
+        """The next hops of (sources[i], destinations[i]), by a binary search over the runs of each source"""
+        if isinstance(sources, int) and isinstance(destinations, int):
+            low, high = self.offsets[sources], self.offsets[sources + 1]
+            position = self.order[destinations]
+            run = low + self.starts[low:high].searchsorted(position, side="right") - 1
+            return (self.hops[run] if run >= low and position < self.stops[run] else self.default[sources])
+
+        sources, destinations = asarray(sources, dtype=int64), asarray(destinations, dtype=int64)
+        position = self.order[destinations]
+        low, high = self.offsets[sources], self.offsets[sources + 1]
+        first = low.copy()
+        while True:  # Vectorized binary search of the last run starting before position
+            searching = low < high
+            if not searching.any():
+                break
+            middle = (low + high) // 2
+            before = searching & (self.starts[minimum(middle, max(0, len(self.starts) - 1))] <= position)
+            low = where(before, middle + 1, low)
+            high = where(searching & ~before, middle, high)
+        run = maximum(low - 1, 0)
+        found = (low > first) & (position < (self.stops[run] if len(self.stops) else 0))
+        return (where(found, self.hops[run] if len(self.hops) else 0, self.default[sources]))
+
+    def rows(self, sources):
+        """Decompresses the rows of the given sources"""
+        sources = asarray(sources, dtype=int64)
+        rows = repeat(self.default[sources, None], self.size, axis=1)
+        runs = concatenate([arange(self.offsets[source], self.offsets[source + 1]) for source in sources.tolist()] + [empty(0, dtype=int64)])
+        lengths = (self.stops[runs] - self.starts[runs]).astype(int64)
+        row = repeat(repeat(arange(len(sources)), diff(self.offsets)[sources]), lengths)
+        position = arange(lengths.sum()) - repeat(cumsum(lengths) - lengths, lengths) + repeat(self.starts[runs], lengths)
+        rows[row, position] = repeat(self.hops[runs], lengths)
+        return (rows[:, self.order])
+
+
+class RoutingTables:
+    """
+    The routing tables of every Node of a Graph, stored as two size x size arrays.
+    \n - next_hop: int32 -> next_hop[source, destination] is the neighbor to route to, -1 if there is none.
+    \n - distance: float32 -> distance[source, destination] is the length of the shortest path, inf if unreachable.
+    \nFloat32 distances are exact as long as they stay below 2²⁴.
+    \nCompressed tables only keep a CompressedNextHop and no distance (None), they cannot be updated.
+    \n - equal_cost: EqualCostHops | None -> The other equal-cost next hops, computed with ecmp.
+    """
+
+    METHODS = ["auto", "bellman", "floyd", "scipy"]
+    BATCH_ELEMENTS = 1 << 22  # Bounds the temporary (sources x links) arrays of a batch
+    CHUNKS_PER_WORKER = 4  # Smaller chunks balance the load between workers
+
+    def __init__(self, next_hop, distance, method: str = "bellman", equal_cost: EqualCostHops = None):
+        self.next_hop = next_hop
+        self.distance = distance
+        self.method = method
+        self.equal_cost = equal_cost
+
+    @classmethod
+    def compute(cls, indptr, indices, weights, method: str = "auto", workers: int = 1, counters: dict = None,
+                compress: bool = False, ecmp: bool = False):
+        """
+        Computes all the routing tables in batches of sources.
+        \nmethod: str {auto, bellman, floyd, scipy} -> auto uses SciPy if it's installed, bellman otherwise.
+        \nworkers: int -> Number of processes sharing the sources, 0 uses every core. Floyd-Warshall is always serial.
+        \ncounters: dict -> If provided, the operation counts of every worker are added to it.
+        \ncompress: bool -> Compress the rows batch by batch, the full matrices are never allocated. Always serial.
+        \necmp: bool -> Also store every equal-cost next hop, see EqualCostHops. Needs the distances, not compress.
+        """
+        if method not in cls.METHODS:
+            raise ValueError(f"The provided routing method ({method}) does not exist")
+        if method == "auto":
+            try:
+                import scipy.sparse.csgraph  # noqa: F401
+                method = "scipy"
+            except ImportError:
+                method = "bellman"
+
+        size = len(indptr) - 1
+        if compress and ecmp:
+            raise ValueError("The equal-cost next hops need the distances, which compressed routing tables do not keep")
+        if compress:
+            return (cls._compute_compressed(indptr, indices, weights, method, counters))
+        workers = min(workers or cpu_count() or 1, size)
+        if workers <= 1 or method == "floyd":
+            tables = cls(empty((size, size), dtype=int32), empty((size, size), dtype=float32), method)
+            cls.fill(indptr, indices, weights, method, tables.next_hop, tables.distance, arange(size), counters)
+        else:
+            tables = cls._compute_parallel(indptr, indices, weights, method, workers, counters)
+        if ecmp:
+            tables.equal_cost = EqualCostHops.compute(indptr, indices, weights, tables.distance, tables.next_hop)
+        return (tables)
+
+    @classmethod
+    def _compute_parallel(cls, indptr, indices, weights, method: str, workers: int, counters: dict = None):
+        """
+        Splits the sources in contiguous chunks computed by a ProcessPoolExecutor.
+        The CSR arrays are copied in shared memory. Both matrices are mapped from temporary files (see mapped_array)
+        that each worker writes its rows into, and they stay the memory of the returned tables: nothing is copied.
+        """
+        from concurrent.futures import ProcessPoolExecutor
+
+        size = len(indptr) - 1
+        blocks, specs, outputs = {}, {}, {}
+        try:
+            for key, source in [("indptr", indptr), ("indices", indices), ("weights", weights)]:
+                blocks[key], specs[key] = share_array(source)
+            next_hop, outputs["next_hop"] = mapped_array((size, size), int32)
+            distance, outputs["distance"] = mapped_array((size, size), float32)
+            chunk = -(-size // (workers * cls.CHUNKS_PER_WORKER))
+            with ProcessPoolExecutor(max_workers=workers) as executor:
+                futures = [executor.submit(routing_worker, specs, outputs, method, start, min(start + chunk, size),
+                                           counters is not None)
+                           for start in range(0, size, chunk)]
+                for future in futures:
+                    for name, amount in (future.result() or {}).items():
+                        add_count(counters, name, amount)
+            return (cls(next_hop.view(ndarray), distance.view(ndarray), method))
+        finally:
+            for block in blocks.values():
+                block.close()
+                block.unlink()
+            for spec in outputs.values():
+                release_mapped(spec)
+
+    @classmethod
+    def _compute_compressed(cls, indptr, indices, weights, method: str, counters: dict = None):
+        """Computes the rows of a batch of sources, compresses them, and reuses their memory for the next batch"""
+        size = len(indptr) - 1
+        batch = max(1, min(size, cls.BATCH_ELEMENTS // max(1, size)))
+        next_hop, distance = empty((batch, size), dtype=int32), empty((batch, size), dtype=float32)
+
+        def blocks():
+            for first in range(0, size, batch):
+                sources = arange(first, min(first + batch, size))
+                cls.fill(indptr, indices, weights, method, next_hop, distance, sources, counters, first)
+                yield (first, next_hop[:len(sources)])
+        order = CompressedNextHop.tree_order(indptr, indices, weights)
+        return (cls(CompressedNextHop.from_rows(size, order, blocks()), None, method))
+
+    @property
+    def compressed(self) -> bool:
+        return (self.distance is None)
+
+    @property
+    def nbytes(self) -> int:
+        return (self.next_hop.nbytes + (0 if self.compressed else self.distance.nbytes)
+                + (0 if self.equal_cost is None else self.equal_cost.nbytes))
+
+    def compress(self, indptr, indices, weights, chunk_rows: int = 256):
+        """Returns compressed copies of the tables, the order of the destinations is taken from the CSR arrays"""
+        if self.compressed:
+            return (self)
+        order = CompressedNextHop.tree_order(indptr, indices, weights)
+        return (RoutingTables(CompressedNextHop.from_matrix(self.next_hop, order, chunk_rows), None, self.method,
+                              self.equal_cost))
+
+    @classmethod
+    def fill(cls, indptr, indices, weights, method: str, next_hop, distance, sources, counters: dict = None,
+             first: int = 0):
+        """
+        Computes the rows of the given sources into the next_hop and distance matrices.
+        The row of a source is source - first, to fill a block of rows starting at first.
+        """
+        size = len(indptr) - 1
+        all_distances = floyd_warshall(indptr, indices, weights) if method == "floyd" else None
+        if counters is not None:
+            add_count(counters, "routing_sources", len(sources))
+            if method == "floyd":
+                add_count(counters, "floyd_relaxations", size ** 3)
+        batch = max(1, min(size, cls.BATCH_ELEMENTS // max(1, len(indices), size)))
+        for start in range(0, len(sources), batch):
+            sources_batch = sources[start:start + batch]
+            match method:
+                case "floyd":
+                    rows, predecessor = all_distances[sources_batch], None
+                case "scipy":
+                    rows, predecessor = scipy_shortest_paths(indptr, indices, weights, sources_batch)
+                    if counters is not None:  # Each search pops every reachable Node once from SciPy's heap
+                        add_count(counters, "dijkstra_pops", int(isfinite(rows).sum()))
+                case _:
+                    rows, predecessor = None, None
+            rows, hops = routing_rows(indptr, indices, weights, sources_batch, rows, predecessor, counters)
+            distance[sources_batch - first] = rows
+            next_hop[sources_batch - first] = hops
+
+    def update(self, indptr, indices, weights, node_A: int, node_B: int, previous: float, value: float,
+               counters: dict = None):
+        """
+        Repairs the routing tables after the link (node_A, node_B) changed from previous to value (0 is no link).
+        The CSR arrays must already hold the new value.
+        \nOnly the sources whose shortest path tree can change are recomputed:
+        \n - If the link got slower or was removed, the sources for which it was on a shortest path.
+        \n - If the link got faster or was added, the sources for which it now shortens a path.
+        \nReturns the (source, destination) pairs whose next hop changed, as a (k, 2) array.
+        """
+        if self.compressed:
+            raise ValueError("Compressed routing tables cannot be updated, compute them again")
+        previous = inf if previous == 0 else float(previous)
+        value = inf if value == 0 else float(value)
+        to_A, to_B = self.distance[:, node_A].astype(float64), self.distance[:, node_B].astype(float64)
+        if value > previous:
+            on_path = (isclose(to_A + previous, to_B, rtol=DISTANCE_RTOL, atol=0)
+                       | isclose(to_B + previous, to_A, rtol=DISTANCE_RTOL, atol=0))
+            affected = on_path & isfinite(minimum(to_A, to_B))
+        elif value < previous:
+            affected = (to_A + value < to_B) | (to_B + value < to_A)
+        else:
+            return (empty((0, 2), dtype=int64))
+        sources = nonzero(affected)[0]
+        before = self.next_hop[sources]
+        before_distance = self.distance[sources] if self.equal_cost is not None else None  # Fancy indexing copies
+        # Floyd-Warshall would recompute all the pairs, repairs only run single source searches
+        method = "bellman" if self.method == "floyd" else self.method
+        self.fill(indptr, indices, weights, method, self.next_hop, self.distance, sources, counters)
+        if self.equal_cost is not None:  # The link changes the equal-cost hops of its ends even if no route changed
+            rows, destinations = nonzero((self.next_hop[sources] != before) | (self.distance[sources] != before_distance))
+            self.equal_cost = self.equal_cost.update(indptr, indices, weights, self.distance, self.next_hop,
+                                                     sources[rows], destinations, node_A, node_B)
+        rows, destinations = nonzero(self.next_hop[sources] != before)
+        return (array([sources[rows], destinations], dtype=int64).T.reshape(-1, 2))
+
+    def mismatches(self, indptr, indices, weights):
+        """
+        Compares the tables with a full computation over the CSR arrays, to check the repairs of update.
+        \nReturns the (source, destination) pairs whose distance differs, or whose next hop is not
+        the first link of a shortest route, as a (k, 2) array.
+        """
+        if self.compressed:
+            raise ValueError("Compressed routing tables keep no distances to compare")
+        expected = RoutingTables.compute(indptr, indices, weights)
+        reachable = isfinite(expected.distance)
+        wrong = ~isclose(self.distance, expected.distance, rtol=DISTANCE_RTOL, atol=0) & reachable
+        wrong |= (reachable != isfinite(self.distance)) | (reachable & (self.next_hop < 0))
+        sources, destinations = nonzero(reachable & (self.next_hop >= 0))
+        hops = self.next_hop[sources, destinations]
+        lengths = link_weights(indptr, indices, weights, sources, hops) + expected.distance[hops, destinations]
+        tight = isclose(lengths, expected.distance[sources, destinations], rtol=DISTANCE_RTOL, atol=0)
+        wrong[sources[~tight], destinations[~tight]] = True
+        wrong &= ~eye(len(indptr) - 1, dtype=bool)
+        return (array(nonzero(wrong), dtype=int64).T.reshape(-1, 2))
+
+
+class RoutingTableView(Mapping):
+    """
+    Read only view of the routing table of a Node: {destination name: next hop name}.
+    \nIt reads the RoutingTables arrays of its Graph, so no dict is ever built.
+    """
+
+    def __init__(self, graph, index: int):
+        self.graph = graph
+        self.index = index
+
+    def __getitem__(self, destination: str):
+        destination = self.graph.get_invert_id(destination)
+        if destination == self.index:
+            raise KeyError(destination)
+        next_hop = self.graph.routes.next_hop[self.index, destination]
+        return (self.graph.nodes[next_hop].name if next_hop >= 0 else None)
+
+    def __iter__(self):
+        return (name for index, name in enumerate(self.graph.nodes.names) if index != self.index)
+
+    def __len__(self) -> int:
+        return (len(self.graph.nodes) - 1)
+
+    def __repr__(self) -> str:
+        return (repr(dict(self)))
+
+
+class DisjointSet:
+    """
+    Union-find over Node indexes (path halving, union by size), used to track the connected components.
+    \nA link only merges components: a removed link requires building a new DisjointSet.
+    """
+
+    def __init__(self, size: int):
+        self.parent = arange(size, dtype=int64)
+        self.component_size = ones(size, dtype=int64)
+        self.components = size
+
+    @classmethod
+    def from_edges(cls, size: int, node_A, node_B):
+        """
+        Builds the union-find of a whole edge list at once: the roots of both ends of every link
+        are hooked to the smallest one, then the paths are compressed, until every link is inside a component.
+        """
+        temp = cls(size)
+        parent = temp.parent
+        node_A, node_B = node_A.astype(int64), node_B.astype(int64)
+        while True:
+            root_A, root_B = parent[node_A], parent[node_B]
+            split = root_A != root_B
+            if not split.any():
+                break
+            root_A, root_B = root_A[split], root_B[split]
+            minimum.at(parent, root_A, root_B)
+            minimum.at(parent, root_B, root_A)
+            temp.roots()
+            parent = temp.parent
+        roots = temp.roots()
+        temp.component_size = bincount(roots, minlength=size)
+        temp.components = int((roots == arange(size)).sum())
+        return (temp)
+
+    def find(self, node: int) -> int:
+        parent = self.parent
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return (int(node))
+
+    def union(self, node_A: int, node_B: int) -> bool:
+        """Merges the components of both Nodes, returns False if they were already connected"""
+        root_A, root_B = self.find(node_A), self.find(node_B)
+        if root_A == root_B:
+            return (False)
+        if self.component_size[root_A] < self.component_size[root_B]:
+            root_A, root_B = root_B, root_A
+        self.parent[root_B] = root_A
+        self.component_size[root_A] += self.component_size[root_B]
+        self.components -= 1
+        return (True)
+
+    def roots(self):
+        """Returns the root of every Node, fully compressing the paths"""
+        while True:
+            grand_parent = self.parent[self.parent]
+            if array_equal(grand_parent, self.parent):
+                return (self.parent)
+            self.parent = grand_parent
+
+    def connected(self) -> bool:
+        return (self.components <= 1)
+
+
+class Node:
+    """
+    Used to represent a Node which is used for Graphs.
+    \nIt's a light view over the row index of the NodeTable of its Graph, created on demand:
+    the Node itself stores nothing else.
+    """
+
+    __slots__ = ("graph", "index")
+
+    def __init__(self, graph, index: int):
+        self.graph = graph
+        self.index = index
+
+    @property
+    def id(self) -> int:
+        return (self.index)
+
+    @property
+    def tier(self) -> int:
+        return (int(self.graph.nodes.tier[self.index]))
+
+    @property
+    def name(self) -> str:
+        return (self.graph.nodes.names[self.index])
+
+    @name.setter
+    def name(self, name: str):
+        self.graph.nodes.rename(self.index, name)
+
+    @property
+    def neighbors(self) -> list:
+        """The indexes of the neighbors, read from the adjacency store of the Graph"""
+        return (self.graph.matrix.neighbors(self.index)[0].tolist())
+
+    @property
+    def routing_table(self) -> RoutingTableView | dict:
+        """{destination name: next hop name}, read from the routing tables of the Graph"""
+        if self.graph.routes is None:
+            return ({})
+        return (RoutingTableView(self.graph, self.index))
+
+    def __eq__(self, other) -> bool:
+        return (isinstance(other, Node) and self.graph is other.graph and self.index == other.index)
+
+    def __hash__(self) -> int:
+        return (hash((id(self.graph), self.index)))
+
+    def __repr__(self) -> str:
+        return (f'{self.infos()}')
+
+    def __str__(self) -> str:
+        return (f"{self.name}")
+
+    def infos(self=None):
+        """Used to get all attributes of an object"""
+        return ({"id": self.id, "tier": self.tier, "name": self.name, "neighbors": self.neighbors, "routing_table": self.routing_table})
+
+
+class NodeTable:
+    """
+    Struct of arrays holding the Nodes of a Graph, indexed like the adjacency matrix:
+    \n - tier: int8 array
+    \n - degree: int32 array, the one kept in sync by the adjacency store
+    \n - names: list of interned names, and index: {name: index}
+    \n - tier_ranges: {tier: (start, stop)}, the Nodes of a tier are contiguous
+    \nIndexing or iterating over it gives Node views.
+    \nThe Graph is held by a weak reference: without a cycle, a dropped Graph and its arrays are freed at once.
+    """
+
+    PREFIXES = {1: "B", 2: "T", 3: "R"}  # Backbone, Transit, Regular
+
+    def __init__(self, graph, rules: tuple, names: list = None):
+        self._graph = ref(graph)
+        self.tier = repeat(array([1, 2, 3], dtype=int8), rules)
+        boundaries = [0, *cumsum(rules).tolist()]
+        self.tier_ranges = {tier: (boundaries[tier - 1], boundaries[tier]) for tier in (1, 2, 3)}
+        self.names = []
+        self.index = {}
+        if names is not None:
+            for name in names:
+                self.add_name(name)
+            return
+        for tier, amount in zip((1, 2, 3), rules):
+            for iteration in range(1, amount + 1):
+                self.add_name(f"{self.PREFIXES[tier]}{iteration}")
+
+    def add_name(self, name: str) -> str:
+        """Registers the name of the next Node, a name already used gets the index as suffix"""
+        if name in self.index:
+            name = f"{name}{len(self.names)}"
+        name = intern(name)
+        self.index[name] = len(self.names)
+        self.names.append(name)
+        return (name)
+
+    def rename(self, index: int, name: str) -> str:
+        """Renames a Node, keeping the names list and the {name: index} map in sync"""
+        if self.index.get(name, index) != index:
+            raise NameError(f"The provided Node name ({name}) is already used")
+        del self.index[self.names[index]]
+        self.names[index] = intern(name)
+        self.index[self.names[index]] = index
+        return (self.names[index])
+
+    @property
+    def graph(self):
+        return (self._graph())
+
+    @property
+    def degree(self):
+        return (self.graph.matrix.degree)
+
+    def __len__(self) -> int:
+        return (len(self.names))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return ([Node(self.graph, position) for position in range(*index.indices(len(self)))])
+        index = operator_index(index)
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f"The Node index ({index}) is out of range")
+        return (Node(self.graph, index))
+
+    def __iter__(self):
+        return (Node(self.graph, index) for index in range(len(self)))
+
+
+class Graph:
+    """
+    This class represent a non-oriented graph, made of Nodes.
+    The matrix is upper half only, excluding the diagonal.
+    \nRules are the distribution of nodes per tier
+    \nOptional arguments (kwargs):
+    \n - no_generation: bool = False -> Use to generate a blank Graph.
+    \n - connected: bool = True -> Generate a graph until it's connected or not.
+    \n - backend: str {auto, dense, sparse} = auto -> The adjacency store, auto uses the dense matrix up to DENSE_LIMIT Nodes.
+    \n - routing: str {auto, bellman, floyd, scipy} = auto -> The algorithm computing the routing tables.
+    \n - workers: int = 1 -> Number of processes computing the routing tables, 0 uses every core.
+    \n - compress_routes: bool = False -> Keep the routing tables compressed, see CompressedNextHop.
+    \n - ecmp: bool = False -> Also keep every equal-cost next hop, see EqualCostHops and link_utilization.
+    \n - repair: bool = False -> Link the disconnected components to the rest instead of generating a new graph.
+    \n - max_attempts: int = MAX_ATTEMPTS -> Number of generations before giving up with a RuntimeError.
+    \n - generator: str {legacy, bulk} = legacy -> Create the links one by one, or all at once with NumPy (large Graphs).
+    \n - seed: int = None -> Seed of self.rng, used by the bulk generator and the repairs.
+    \n - names: list = None -> The names of the Nodes, generated from the rules by default.
+    \n - instrument: bool = False -> Count and time the hot paths, see stats.
+    \n - profile: str {None, cprofile, tracemalloc} = None -> Also profile every phase when instrumented.
+    """
+
+    DENSE_LIMIT = 2000  # Above this size, the dense matrix does not fit in memory anymore
+    MAX_ATTEMPTS = 100
+    SNAPSHOT_VERSION = 3  # 2: compressed routing tables, 3: equal-cost next hops
+    EXPORT_CHUNK_ROWS = 256
+    TRANSIT_DEGREES = ((2, 3, 4), (0.08, 0.79, 0.13))  # Distribution of the Transit-Transit degree of the legacy rules
+
+    def __init__(self, name: str = None, size=100, rules=(10, 20, 70), **kwargs):
+        self.name = name if name else f"Graph_{datetime.now().strftime("%Y_%m_%d_%H_%M_%S")}"
+        self.distribution = rules
+        self.size = size
+        self.backend = kwargs.get("backend", "auto")
+        if self.backend == "auto":
+            self.backend = "dense" if size <= self.DENSE_LIMIT else "sparse"
+        if self.backend not in ["dense", "sparse"]:
+            raise ValueError(f"The provided backend ({self.backend}) does not exist")
+
+        self.rng = default_rng(kwargs.get("seed"))
+        self.instrumentation = Instrumentation(kwargs.get("instrument", False), kwargs.get("profile"))
+
+        self.nodes = self._generate_nodes(rules, kwargs.get("names"))
+        self.matrix = self._generate_matrix(self.size)
+        self.components = DisjointSet(self.size)
+        self.not_connected = set()
+        self.routes = None
+        if kwargs.get("no_generation", False):
+            return
+        self._generate_links(rules, **kwargs)
+        self._generate_routing_table(kwargs.get("routing", "auto"), kwargs.get("workers", 1),
+                                     kwargs.get("compress_routes", False), kwargs.get("ecmp", False))
+
+    def __str__(self) -> str:
+        return ('\n'.join(str(node.infos()) for node in self.nodes))
+
+    def instrument(self, enabled: bool = True, profile: str = None):
+        """Switches the instrumentation on or off (a loaded Graph is not instrumented), the data is kept"""
+        if profile not in Instrumentation.PROFILERS:
+            raise ValueError(f"The provided profiler ({profile}) does not exist")
+        self.instrumentation.enabled = enabled
+        self.instrumentation.profile = profile
+
+    def stats(self) -> dict:
+        """
+        Returns the data of the instrumentation, see Instrumentation.stats:
+        \n - counters: generation_attempts, links_created, links_removed, union_find_unions, connectivity_checks,
+        connectivity_links_scanned, routing_sources, bellman_passes, bellman_relaxations, dijkstra_pops,
+        floyd_relaxations, pointer_jumps, traceroute_queries, traceroute_hops.
+        \n - timers: generate, connectivity, routing, routing_update, traceroute, export.
+        \n - profiles: per outermost phase, if a profiler was chosen.
+        """
+        return (self.instrumentation.stats())
+
+    def _generate_nodes(self, rules: tuple, names: list = None) -> NodeTable:
+        """Creates the table of Nodes and their distribution: Backbone, then Transit, then Regular"""
+        return (NodeTable(self, rules, names))
+
+    def save(self, path_name: str):
+        """
+        Saves the Graph as a versioned binary snapshot: a folder holding a header.json and one .npy file per array
+        (names, tier, the CSR adjacency indptr/indices/weights, and the next_hop/distance matrices if computed,
+        or the arrays of the CompressedNextHop prefixed by route_, and the EqualCostHops prefixed by ecmp_).
+        The header is written last, a folder without it is an incomplete snapshot.
+        """
+        makedirs(path_name, exist_ok=True)
+        indptr, indices, weights = self.matrix.csr()
+        arrays = {"names": array(self.nodes.names), "tier": self.nodes.tier,
+                  "indptr": indptr, "indices": indices, "weights": weights}
+        if self.routes is not None and self.routes.compressed:
+            arrays.update({f"route_{key}": getattr(self.routes.next_hop, key) for key in COMPRESSED_ARRAYS})
+        elif self.routes is not None:
+            arrays.update(next_hop=self.routes.next_hop, distance=self.routes.distance)
+        if self.routes is not None and self.routes.equal_cost is not None:
+            arrays.update({f"ecmp_{key}": getattr(self.routes.equal_cost, key) for key in ("keys", "offsets", "hops")})
+        for key, value in arrays.items():
+            save_array(path.join(path_name, f"{key}.npy"), value)
+        header = {"format": "graph-snapshot", "version": self.SNAPSHOT_VERSION, "name": self.name,
+                  "size": self.size, "distribution": list(self.distribution), "backend": self.backend,
+                  "routing": self.routes.method if self.routes is not None else None,
+                  "compressed_routes": self.routes is not None and self.routes.compressed,
+                  "ecmp": self.routes is not None and self.routes.equal_cost is not None}
+        with open(path.join(path_name, "header.json"), "w", encoding="utf-8") as file:
+            dump(header, file, indent=4)
+
+    @classmethod
+    def load(cls, path_name: str, mmap: bool = True, read_only: bool = False):
+        """
+        Loads a snapshot written by save without generating or computing anything.
+        \nWith mmap, the arrays are memory mapped copy-on-write: the pages are only read when used,
+        and processes loading the same snapshot share them until they modify them.
+        \nWith read_only, they are mapped read-only instead: any write raises, so the Graph cannot be modified.
+        """
+        with open(path.join(path_name, "header.json"), encoding="utf-8") as file:
+            header = load_json(file)
+        if header.get("format") != "graph-snapshot" or header.get("version", 0) > cls.SNAPSHOT_VERSION:
+            raise ValueError(f"The folder {path_name} is not a supported Graph snapshot")
+
+        def read(key: str):
+            return (load_array(path.join(path_name, f"{key}.npy"), mmap_mode=("r" if read_only else "c") if mmap else None))
+
+        size = header["size"]
+        temp = cls(header["name"], size, tuple(header["distribution"]), backend=header["backend"],
+                   names=read("names").tolist(), no_generation=True)
+        csr = read("indptr"), read("indices"), read("weights")
+        if temp.backend == "sparse":
+            temp.matrix = SparseAdjacency.from_csr(size, *csr)
+        else:
+            source = repeat(arange(size), diff(csr[0]))
+            upper = source < csr[1]
+            temp.matrix = DenseAdjacency.from_edges(size, source[upper], csr[1][upper].astype(int64), csr[2][upper])
+        temp.components = None  # Built by the first is_connected
+        if header["routing"] is not None and header.get("compressed_routes", False):
+            next_hop = CompressedNextHop(*(read(f"route_{key}") for key in COMPRESSED_ARRAYS))
+            temp.routes = RoutingTables(next_hop, None, header["routing"])
+        elif header["routing"] is not None:
+            temp.routes = RoutingTables(read("next_hop"), read("distance"), header["routing"])
+        if header["routing"] is not None and header.get("ecmp", False):
+            temp.routes.equal_cost = EqualCostHops(size, *(read(f"ecmp_{key}") for key in ("keys", "offsets", "hops")))
+        return (temp)
+
+    def _generate_matrix(self, size) -> DenseAdjacency | SparseAdjacency:
+        """Creates an empty adjacency store of the Graph's backend"""
+        if self.backend == "sparse":
+            return (SparseAdjacency(size))
+        return (DenseAdjacency(size))
+
+    @instrumented("generate")
+    def _generate_links(self, rules, **kwargs):
+        """
+        The matrix follow these rules: A link exists if it's >1, a line show a Node's neighbors,
+        a column show what a Node is connected to, the value represents the speed of the link
+        \nOptionnal Arguments:
+        \n - connected: bool -> Generate a graph until it's connected or not.
+        \n - repair: bool -> Link the disconnected components with _repair_links instead of generating again.
+        \n - max_attempts: int -> Number of generations before raising a RuntimeError.
+        \n - generator: str {legacy, bulk} -> See _generate_bulk_links.
+        """
+
+        connected = kwargs.get("connected", True)
+        first_iter = True
+        cpt = 0
+        while (self.is_connected() is not connected) or (first_iter is True):
+            if cpt >= kwargs.get("max_attempts", self.MAX_ATTEMPTS):
+                raise RuntimeError(f"Could not generate a {"" if connected else "not "}connected graph in {cpt} attempts")
+            cpt += 1
+            self.instrumentation.count("generation_attempts")
+            first_iter = False
+            if kwargs.get("generator", "legacy") == "bulk":
+                self._generate_bulk_links(rules)
+            else:
+                self._generate_legacy_links(rules)
+            if connected and kwargs.get("repair", False) and not self.is_connected():
+                self._repair_links(rules)
+        logger.info("Generated graph in %d attempts", cpt, extra={"event": "generated", "attempts": cpt})
+
+    def _generate_legacy_links(self, rules):
+        """Creates the links one by one with set_link, following the rules of _generate_links"""
+        self.matrix = self._generate_matrix(self.size)  # Reset the matrix if failure
+        self.components = DisjointSet(self.size)
+        # Tier I, each pair once: visiting both triangles gave a pair two 75% chances
+        for node_A in range(0, rules[0]):
+            for node_B in range(node_A + 1, rules[0]):
+                if (self.get_link(self.matrix, node_A, node_B) == 0) and (random_event(75)):
+                    link_value = randint(5, 10)
+                    self.set_link(self.matrix, node_A, node_B, link_value)
+
+        # Tier II
+        for node_A in range(rules[0], rules[0] + rules[1]):
+            # Part 2
+            if self.matrix.degree[node_A] < 2:
+                candidates = self.select(tier=2, degree=(3, "<"), exclude=node_A).tolist()
+
+                if len(candidates) > 3:  # Sample doesn't work if the population is less than the picked amount
+                    selection = sample(candidates, randint(2, 3))
+                else:
+                    selection = candidates
+                for node_B in selection:
+                    if (self.get_link(self.matrix, node_A, node_B) == 0):  # Do not overide an existing link or a diagonal
+                        link_value = randint(10, 20)
+                        self.set_link(self.matrix, node_A, node_B, link_value)
+        for node_A in range(rules[0], rules[0] + rules[1]):
+            # Part 1
+            selection = sample(list(range(0, rules[0])), randint(1, 2))
+            for node_B in selection:
+                if (self.get_link(self.matrix, node_A, node_B) == 0):  # Do not overide an existing link or a diagonal
+                    link_value = randint(10, 20)
+                    self.set_link(self.matrix, node_A, node_B, link_value)
+        # Tier III
+        for node_A in range(rules[0] + rules[1], sum(rules)):
+            # Part 1
+            selection = sample(list(range(rules[0], rules[0] + rules[1])), 2)
+            for node_B in selection:
+                if (self.get_link(self.matrix, node_A, node_B) == 0):  # Do not overide an existing link or a diagonal
+                    link_value = randint(20, 50)
+                    self.set_link(self.matrix, node_A, node_B, link_value)
+
+    def _generate_bulk_links(self, rules):
+        """
+        Draws every link at once from self.rng and writes them straight into a new adjacency store.
+        It follows the same distributions as _generate_legacy_links:
+        \n - Backbone: each pair is linked with a probability of 75%, values in [5, 10].
+        \n - Transit: 1 or 2 distinct Backbones, and Transit peers drawn from a configuration model
+        matching the legacy Transit degree distribution (TRANSIT_DEGREES), values in [10, 20], see _pair_stubs.
+        \n - Regular: 2 distinct Transits, values in [20, 50].
+        """
+        rng = self.rng
+        backbone, transit, regular = rules
+        node_A, node_B, weights = [], [], []
+
+        def add(a, b, low, high):
+            node_A.append(a)
+            node_B.append(b)
+            weights.append(rng.integers(low, high + 1, len(a)))
+
+        # Tier I, by blocks of rows to bound the memory of the random draws
+        block = max(1, (1 << 22) // max(1, backbone))
+        for start in range(0, backbone, block):
+            rows, columns = nonzero(rng.random((min(block, backbone - start), backbone)) < 0.75)
+            rows += start
+            upper = rows < columns
+            add(rows[upper], columns[upper], 5, 10)
+
+        # Tier II
+        transits = arange(backbone, backbone + transit)
+        if backbone:
+            first, second = self._draw_distinct(transit, backbone)
+            add(transits, first, 10, 20)
+            if second is not None:
+                twice = rng.random(transit) < 0.5
+                add(transits[twice], second[twice], 10, 20)
+        if transit > 1:
+            degrees = rng.choice(self.TRANSIT_DEGREES[0], size=transit, p=self.TRANSIT_DEGREES[1])
+            pairs = self._pair_stubs(repeat(transits, degrees))
+            add(pairs[:, 0], pairs[:, 1], 10, 20)
+
+        # Tier III
+        if transit:
+            regulars = arange(backbone + transit, sum(rules))
+            first, second = self._draw_distinct(regular, transit)
+            add(regulars, first + backbone, 20, 50)
+            if second is not None:
+                add(regulars, second + backbone, 20, 50)
+
+        node_A, node_B, weights = concatenate(node_A), concatenate(node_B), concatenate(weights).astype(float64)
+        low, high = minimum(node_A, node_B), maximum(node_A, node_B)
+        kept = low != high
+        keys, first_found = unique(low[kept] * self.size + high[kept], return_index=True)
+        node_A, node_B = keys // self.size, keys % self.size
+        store = SparseAdjacency if self.backend == "sparse" else DenseAdjacency
+        self.matrix = store.from_edges(self.size, node_A, node_B, weights[kept][first_found])
+        self.instrumentation.count("links_created", len(node_A))
+        self.components = DisjointSet.from_edges(self.size, node_A, node_B)
+
+    def _pair_stubs(self, stubs, max_rounds: int = 100):
+        """
+        Pairs the stubs of a configuration model into links without self-loops or duplicates,
+        so every Node keeps the degree it was drawn (one stub is left out if their number is odd).
+        \nThe stubs of the invalid pairs are shuffled again with those of as many valid pairs, until every pair
+        is valid. The pairs still invalid after max_rounds (only possible with very few Nodes) are dropped.
+        \nReturns the links as a (k, 2) array.
+        """
+        rng = self.rng
+        pairs = rng.permutation(stubs)
+        pairs = pairs[:len(pairs) // 2 * 2].reshape(-1, 2)
+        for attempt in range(max_rounds + 1):
+            low, high = pairs.min(axis=1), pairs.max(axis=1)
+            invalid = ones(len(pairs), dtype=bool)
+            invalid[unique(low * self.size + high, return_index=True)[1]] = False  # The first of duplicates is kept
+            invalid |= low == high
+            wrong = nonzero(invalid)[0]
+            if len(wrong) == 0 or attempt == max_rounds:
+                break
+            valid = nonzero(~invalid)[0]
+            redraw = concatenate([wrong, rng.choice(valid, min(len(wrong), len(valid)), replace=False)])
+            pairs[redraw] = rng.permutation(pairs[redraw].ravel()).reshape(-1, 2)
+        return (pairs[~invalid])
+
+    def _draw_distinct(self, count: int, population: int):
+        """Draws two distinct indexes in range(population) count times, the second is None if population < 2"""
+        first = self.rng.integers(0, population, count)
+        if population < 2:
+            return (first, None)
+        second = self.rng.integers(0, population - 1, count)
+        second += second >= first
+        return (first, second)
+
+    def _repair_links(self, rules):
+        """
+        Links every component that does not contain the Node 0 to it, using the Nodes of self.not_connected only.
+        The new link follows the tier rules: a Backbone gets a Backbone (5-10), a Transit gets a Backbone (10-20)
+        and a Regular gets a Transit (20-50). A component that cannot follow them stays disconnected.
+        """
+        roots = self.components.roots()
+        main = roots[0]
+        boundaries = [0, rules[0], rules[0] + rules[1], sum(rules)]
+        targets = {tier: nonzero(roots[boundaries[tier - 1]:boundaries[tier]] == main)[0] + boundaries[tier - 1]
+                   for tier in (1, 2)}
+        rule = {1: (1, 5, 10), 2: (1, 10, 20), 3: (2, 20, 50)}  # tier: (target tier, min value, max value)
+
+        components = {}
+        for node in sorted(self.not_connected):  # Sorted by index, hence by tier
+            components.setdefault(int(roots[node]), []).append(node)
+        for members in components.values():
+            for node in members:
+                target_tier, low, high = rule[self.nodes[node].tier]
+                if len(targets[target_tier]):
+                    self.set_link(self.matrix, node, int(self.rng.choice(targets[target_tier])), int(self.rng.integers(low, high + 1)))
+                    break
+
+    def display_links(self, shape=(10, 20), slice: tuple = (0, 999)):
+        """
+        Will display all the Nodes and their connections.
+        However, since a terminal cannot display 100 Nodes
+        , this function divide all the nodes by a specified shape.
+        \nArguments:
+        \n\tshape: tuple (rows, columns)
+        \n\tslice: tuple (rows, columns) -> based on the shape, the slice will be multiplied
+        """
+        from pandas import DataFrame, option_context
+
+        slice_size = array(slice) * shape[0]
+        slice_diff = (slice_size[1] - slice_size[0])
+
+        matrix = self.matrix.to_dense()[slice_size[0]:slice_size[1]]
+        labels = [node.name for node in self.nodes]
+
+        chunks = [matrix[row:row + slice_diff] for row in range(0, len(matrix), slice_diff)]
+        dataframes = [DataFrame(chunk) for chunk in chunks]
+        # Adjusts the number of columns/raws to display
+        with option_context('display.float_format', '{:.0f}'.format, 'display.max_columns', 100,
+                           'display.width', 9 * shape[1]):
+            for dataframe in dataframes:
+                dataframe.index = labels[slice_size[0]:slice_size[1]]
+                dataframe.columns = labels
+                print(dataframe.map(format_infinity))
+
+    @instrumented("export")
+    def export(self, **kwargs):
+        """
+        Will export the current Graph in the folder "spreadsheets", row chunk by row chunk so the memory stays bounded.
+        \nOptional Arguments:
+        \n - format: str {xlsx, csv, parquet} = xlsx -> One workbook with a sheet per table, or one file per table.
+        \n - tables: tuple = ("matrix",) -> Any of matrix (the links), edges, routing (next hops), distances.
+        \n   Parquet only supports edges and routing, written as long tables (routing includes the distances).
+        \n - chunk_rows: int = EXPORT_CHUNK_ROWS -> Number of matrix rows held in memory at once.
+        \n - folder: str = "spreadsheets"
+        \nReturns the list of written files.
+        """
+        file_format = kwargs.get("format", "xlsx")
+        tables = kwargs.get("tables", ("matrix",))
+        chunk_rows = kwargs.get("chunk_rows", self.EXPORT_CHUNK_ROWS)
+        folder = kwargs.get("folder", "spreadsheets")
+        supported = {"xlsx": EXPORT_TABLES, "csv": EXPORT_TABLES, "parquet": ("edges", "routing")}
+        if file_format not in supported:
+            raise ValueError(f"The provided export format ({file_format}) does not exist")
+        for table in tables:
+            if table not in supported[file_format]:
+                raise ValueError(f"The table {table} cannot be exported as {file_format}")
+            if table in ("routing", "distances") and self.routes is None:
+                raise ValueError(f"The table {table} needs the routing tables")
+            if (table == "distances" or file_format == "parquet" and table == "routing") and self.routes.compressed:
+                raise ValueError(f"The table {table} needs the distances, which compressed routing tables do not keep")
+        makedirs(folder, exist_ok=True)
+
+        if file_format == "xlsx":
+            files = [path.join(folder, f"{self.name}_spreadsheet.xlsx")]
+        else:
+            files = [path.join(folder, f"{self.name}_{table}.{file_format}") for table in tables]
+        logger.info("Exporting to \033[96m%s\033[0m as \033[96m%s\033[0m", path.abspath(folder),
+                    ", ".join(path.basename(file) for file in files), extra={"event": "export", "files": files})
+
+        match file_format:
+            case "xlsx":
+                self._export_xlsx(files[0], tables, chunk_rows)
+            case "csv":
+                for file_name, table in zip(files, tables):
+                    self._export_csv(file_name, table, chunk_rows)
+            case "parquet":
+                for file_name, table in zip(files, tables):
+                    self._export_parquet(file_name, table, chunk_rows)
+        return (files)
+
+    def _export_chunks(self, table: str, chunk_rows: int):
+        """Yields (first row, rows) of the matrix, routing or distances table, chunk_rows rows at a time"""
+        for start in range(0, self.size, chunk_rows):
+            stop = min(start + chunk_rows, self.size)
+            match table:
+                case "matrix":
+                    yield (start, self.matrix.rows(start, stop))
+                case "routing":
+                    yield (start, self.routes.next_hop[start:stop])
+                case "distances":
+                    yield (start, self.routes.distance[start:stop])
+
+    def _export_csv(self, file_name: str, table: str, chunk_rows: int):
+        """Writes a table in a CSV file. Matrices keep their layout, with the names as first row and column"""
+        names = array(self.nodes.names + [""])  # The index -1 (no next hop) gives an empty cell
+        with open(file_name, "w", encoding="utf-8", newline="") as file:
+            if table == "edges":
+                file.write("node_A,node_B,weight\n")
+                node_A, node_B, weights = self.matrix.edges()
+                for start in range(0, len(node_A), chunk_rows * 64):
+                    stop = start + chunk_rows * 64
+                    file.writelines(f"{a},{b},{weight:g}\n" for a, b, weight in
+                                    zip(names[node_A[start:stop]], names[node_B[start:stop]], weights[start:stop].tolist()))
+                return
+            file.write("," + ",".join(self.nodes.names) + "\n")
+            row_format = "%s" + ",%s" * self.size + "\n" if table == "routing" else "%s" + ",%g" * self.size + "\n"
+            for start, rows in self._export_chunks(table, chunk_rows):
+                for offset, row in enumerate((names[rows] if table == "routing" else rows).tolist()):
+                    file.write(row_format % (names[start + offset], *row))
+
+    def _export_parquet(self, file_name: str, table: str, chunk_rows: int):
+        """Writes the edges, or the routing tables as (source, destination, next_hop, distance) rows, with pyarrow"""
+        try:
+            import pyarrow
+            import pyarrow.parquet
+        except ImportError:
+            raise ImportError("The parquet export requires pyarrow (pip install pyarrow)")
+
+        if table == "edges":
+            node_A, node_B, weights = self.matrix.edges()
+            pyarrow.parquet.write_table(pyarrow.table({"node_A": node_A, "node_B": node_B, "weight": weights}), file_name)
+            return
+        destinations = arange(self.size, dtype=int32)
+        schema = pyarrow.schema([("source", pyarrow.int32()), ("destination", pyarrow.int32()),
+                                 ("next_hop", pyarrow.int32()), ("distance", pyarrow.float32())])
+        with pyarrow.parquet.ParquetWriter(file_name, schema) as writer:
+            for start, rows in self._export_chunks("routing", chunk_rows):
+                count = len(rows)
+                writer.write_table(pyarrow.table({
+                    "source": repeat(arange(start, start + count, dtype=int32), self.size),
+                    "destination": tile(destinations, count),
+                    "next_hop": rows.ravel(),
+                    "distance": self.routes.distance[start:start + count].ravel(),
+                }, schema=schema))
+
+    def _export_xlsx(self, file_name: str, tables: tuple, chunk_rows: int):
+        """
+        Writes every table in its own sheet with xlsxwriter's constant_memory mode, which flushes each row once written.
+        The matrix sheet keeps the formats of the original spreadsheet.
+        """
+        from xlsxwriter import Workbook
+
+        if any(table != "edges" for table in tables) and self.size >= EXCEL_MAX_COLUMNS:
+            raise ValueError(f"Excel cannot hold {self.size} columns, export this Graph as csv or parquet")
+        if "edges" in tables and self.matrix.degree.sum() // 2 >= EXCEL_MAX_ROWS:
+            raise ValueError("Excel cannot hold that many edges, export this Graph as csv or parquet")
+
+        with Workbook(file_name, {"constant_memory": True}) as workbook:
+            # Cell Formats
+            header_format = workbook.add_format({'bold': True, 'align': 'center', 'border': 1})
+            centered_format = workbook.add_format({'align': 'center'})
+            backbone_format = workbook.add_format({'align': 'center', 'bg_color': '#963634'})
+            transit_format = workbook.add_format({'align': 'center', 'bg_color': '#007BA7'})
+            ignore_format = workbook.add_format({'align': 'center', 'bg_color': '#222222'})
+            names = self.nodes.names
+
+            for table in tables:
+                worksheet = workbook.add_worksheet(self.name[:31] if table == "matrix" else table)
+                if table == "edges":
+                    worksheet.write_row(0, 0, ["node_A", "node_B", "weight"], header_format)
+                    node_A, node_B, weights = self.matrix.edges()
+                    for start in range(0, len(node_A), chunk_rows * 64):  # As _export_csv
+                        stop = start + chunk_rows * 64
+                        rows = zip(node_A[start:stop].tolist(), node_B[start:stop].tolist(), weights[start:stop].tolist())
+                        for row, (a, b, weight) in enumerate(rows, start + 1):
+                            worksheet.write_row(row, 0, [names[a], names[b], weight])
+                    continue
+
+                row_formats = {}
+                for index in range(1, self.size + 1):
+                    worksheet.set_column(index, index, 3, centered_format)
+                    if index == self.distribution[0]:  # Backbone
+                        row_formats[index] = backbone_format
+                        worksheet.set_column(index, index, 3, backbone_format)
+                    if index == sum(self.distribution[:-1]):  # Transit
+                        row_formats[index] = transit_format
+                        worksheet.set_column(index, index, 3, transit_format)
+                worksheet.write_row(0, 1, names, header_format)
+                for start, rows in self._export_chunks(table, chunk_rows):
+                    for offset, values in enumerate(rows.tolist()):
+                        row = start + offset + 1
+                        if row in row_formats:
+                            worksheet.set_row(row, None, row_formats[row])
+                        worksheet.write_string(row, 0, names[row - 1], header_format)
+                        if table == "routing":
+                            worksheet.write_row(row, 1, [names[hop] if hop >= 0 else "" for hop in values])
+                        elif table == "distances":
+                            worksheet.write_row(row, 1, [format_infinity(value) for value in values])
+                        else:
+                            # All bottom matrix, including diagonal
+                            worksheet.write_row(row, 1, [format_infinity(value) for value in values[:row]], ignore_format)
+                            worksheet.write_row(row, row + 1, values[row:])
+
+    def get_invert_id(self, node_id: int | str):
+        """
+        Get the identifier if you provide an index or a name.
+        \nindex -> name
+        \nname -> index
+        \nBoth are O(1), read from the NodeTable's names list and {name: index} map.
+        """
+
+        if not isinstance(node_id, int | str):
+            raise TypeError(f"The provided node type({type(node_id)}) is incorrect")
+        elif isinstance(node_id, int):
+            return (self.nodes.names[node_id])
+        else:
+            index = self.nodes.index.get(node_id)
+            if index is None:
+                raise NameError(f"The provided Node name ({node_id}) does not exist")
+            return (index)
+
+    def get_neighbors(self, matrix, node: any, **kwargs):
+        """
+        Returns the neighbors of a Node, indicated by it's index
+        \nOptional Arguments:
+        \n\toutput: str {index, name, amount} -> The output format
+        """
+        indices, _ = matrix.neighbors(node if isinstance(node, int) else self.get_invert_id(node))
+        if kwargs.get("output") == "amount":
+            return (len(indices))
+        if kwargs.get("output") == "name":
+            return ([self.nodes[index].name for index in indices])
+        return (indices.tolist())
+
+    def select(self, **kwargs):
+        """
+        Vectorized query engine over the NodeTable: every filter is a boolean mask over the tier and degree arrays,
+        restricted to the contiguous index range of the requested tiers. Returns a sorted NumPy array of indexes.
+        \nOptional Arguments:
+        \n\ttier: int | [int] -> Filter based on the tier(s)
+        \n\tname: str | [str] -> Filter based on the name(s)
+        \n\tdegree: tuple (int, mode: str {==, !=, <, >, <=, >=}) | [tuple] -> Filter based on the amount of neighbors,
+        every condition of a list must hold
+        \n\tmask: bool array of size self.size -> Any other predicate, combined with the others
+        \n\texclude: int | [int] -> Will not include the specified nodes
+        """
+        start, stop = 0, self.size
+        if tier := kwargs.get("tier"):
+            tiers = [tier] if isinstance(tier, int) else list(tier)
+            ranges = [self.nodes.tier_ranges[value] for value in tiers]
+            start, stop = min(first for first, _ in ranges), max(last for _, last in ranges)
+        keep = ones(stop - start, dtype=bool)
+        if tier and len(tiers) > 1:
+            keep &= isin(self.nodes.tier[start:stop], tiers)
+
+        if name := kwargs.get("name"):
+            names = [name] if isinstance(name, str) else name
+            named = zeros(stop - start, dtype=bool)
+            found = [self.nodes.index[value] - start for value in names if value in self.nodes.index]
+            named[[index for index in found if 0 <= index < stop - start]] = True
+            keep &= named
+        if degree := kwargs.get("degree"):
+            for value, mode in [degree] if isinstance(degree[0], int) else degree:
+                if mode not in COMPARISONS:
+                    raise ValueError(f"The provided mode ({mode}) does not exist")
+                keep &= COMPARISONS[mode](self.nodes.degree[start:stop], value)
+        if (mask := kwargs.get("mask")) is not None:
+            keep &= mask[start:stop]
+        result = nonzero(keep)[0] + start
+        if (exclude := kwargs.get("exclude")) is not None:
+            result = result[~isin(result, exclude)]
+        return (result)
+
+    def filter_nodes(self, **kwargs) -> list | Node:
+        """
+        Return all nodes based on the provided filters, see select. If the provided filter is wrong, it will not know.
+        \nOptional Arguments:
+        \n\ttier: int -> Filter based on the tier
+        \n\tname: str -> Filter based on the name
+        \n\tneighbors_limit: tuple (int, mode: str {==, <, >, <=, >=}) -> Filter based on the amount of neighbors and the mode
+        \n\toutput: str {None, index, name, amount} -> Returns a list of indexes or names
+        \n\texclude: [int] -> Will not include the specified nodes
+        """
+
+        res = self.select(tier=kwargs.get("tier"), name=kwargs.get("name"), degree=kwargs.get("neighbors_limit"),
+                          exclude=kwargs.get("exclude"))
+
+        if (kwargs.get("output", False) == "name"):
+            return [self.nodes.names[index] for index in res]
+        if (kwargs.get("output", False) == "amount"):
+            return (len(res))
+        if (kwargs.get("output", False) in [False, "index"]):
+            return (res.tolist())
+
+    def get_node(self, node: int | str):
+        if not isinstance(node, int | str):
+            raise TypeError(f"The provided node type({type(node)}) is incorrect")
+        elif isinstance(node, int):
+            return (self.nodes[node])
+        else:
+            return (self.nodes[self.get_invert_id(node)])
+
+    def get_link(self, matrix, node1: any, node2: any):
+        if isinstance(node1, str) and isinstance(node2, str):  # If given by name
+            a, b = self.get_invert_id(node1), self.get_invert_id(node2)
+            return (matrix[(a, b) if a < b else (b, a)])
+        elif isinstance(node1, int) and isinstance(node2, int):  # If given by index
+            return (matrix[(node1, node2) if node1 < node2 else (node2, node1)])
+        else:
+            print(f"The node's type provided is invalid ({type(node1)}, {type(node2)})")
+            return (None)
+
+    def set_link(self, matrix, node1: any, node2: any, value: float):
+        if isinstance(node1, str) and isinstance(node2, str):  # If given by name
+            a, b = self.get_invert_id(node1), self.get_invert_id(node2)
+        elif isinstance(node1, int) and isinstance(node2, int):  # If given by index
+            a, b = node1, node2
+        else:
+            print(f"The node's type provided is invalid ({type(node1)}, {type(node2)})")
+            return (None)
+        if a == b:
+            return
+        key = (a, b) if a < b else (b, a)
+        if self.instrumentation.enabled and (matrix[key] == 0) != (value == 0):
+            self.instrumentation.count("links_removed" if value == 0 else "links_created")
+        matrix[key] = value
+        self._track_link(matrix, a, b, value)
+        if logger.isEnabledFor(DEBUG):
+            logger.debug("Created link (%s, %s)=%s", self.nodes.names[a], self.nodes.names[b], value,
+                         extra={"event": "set_link", "node_A": a, "node_B": b, "value": value})
+
+    def _track_link(self, matrix, node_A: int, node_B: int, value: float):
+        """Keeps the connected components in sync with the links of the Graph's matrix"""
+        if matrix is not self.matrix:
+            return
+        if value == 0:
+            self.components = None  # Rebuilt by the next is_connected, a union-find cannot split
+        elif self.components is not None:
+            if self.components.union(node_A, node_B):
+                self.instrumentation.count("union_find_unions")
+
+    @instrumented("routing_update")
+    def update_link(self, node_A: int | str, node_B: int | str, value: float, **kwargs):
+        """
+        Creates, changes or removes (value = 0) a link, then repairs only the affected routing tables.
+        \nOptional Arguments:
+        \n\toutput: str {index, name} -> The format of the returned pairs
+        \nReturns the (source, destination) pairs whose next hop changed.
+        """
+        node_A = node_A if isinstance(node_A, int) else self.get_invert_id(node_A)
+        node_B = node_B if isinstance(node_B, int) else self.get_invert_id(node_B)
+        if node_A == node_B:
+            raise ValueError(f"A Node cannot be linked to itself ({self.get_invert_id(node_A)})")
+        if self.routes is not None and self.routes.compressed:  # Checked first, so a failed call changes nothing
+            raise ValueError("Compressed routing tables cannot be updated, compute them again")
+        previous = self.get_link(self.matrix, node_A, node_B)
+        self.set_link(self.matrix, node_A, node_B, value)
+        if self.routes is None:
+            return ([])
+        changed = self.routes.update(*self.matrix.csr(), node_A, node_B, previous, value, self._counters())
+        if kwargs.get("output") == "name":
+            return ([(self.nodes[source].name, self.nodes[destination].name) for source, destination in changed])
+        return (changed)
+
+    def remove_link(self, node_A: int | str, node_B: int | str, **kwargs):
+        """Removes a link, see update_link"""
+        return (self.update_link(node_A, node_B, 0, **kwargs))
+
+    @instrumented("connectivity")
+    def is_connected(self):
+        """
+        Check whether the graph is connected, in O(1) from the union-find kept in sync by set_link.
+        The Nodes that cannot be reached from the Node 0 are stored in self.not_connected.
+        """
+        self.instrumentation.count("connectivity_checks")
+        if self.components is None:
+            edges = self.matrix.edges()[:2]
+            self.instrumentation.count("connectivity_links_scanned", len(edges[0]))
+            self.components = DisjointSet.from_edges(self.size, *edges)
+        if self.components.connected():
+            self.not_connected = set()
+            return (True)
+        roots = self.components.roots()
+        self.not_connected = set(nonzero(roots != roots[0])[0].tolist())
+        return (False)
+
+    @instrumented("routing")
+    def _generate_routing_table(self, method: str = "auto", workers: int = 1, compress: bool = False,
+                                ecmp: bool = False):
+        """
+        Calculate the routing tables of every node at once, see RoutingTables.compute.
+        The Node.routing_table are views over the resulting next hop matrix.
+        """
+        self.routes = RoutingTables.compute(*self.matrix.csr(), method=method, workers=workers, counters=self._counters(),
+                                            compress=compress, ecmp=ecmp)
+
+    def compress_routes(self):
+        """
+        Replaces the routing tables with compressed ones (see CompressedNextHop), dropping the distance matrix.
+        Returns the number of bytes (before, after).
+        """
+        before = self.routes.nbytes
+        self.routes = self.routes.compress(*self.matrix.csr())
+        return ((before, self.routes.nbytes))
+
+    def _counters(self) -> dict | None:
+        """The counters the routing functions add to, None when the instrumentation is disabled"""
+        return (self.instrumentation.counters if self.instrumentation.enabled else None)
+
+    def _parse_node(self, node: int | str) -> int:
+        """Returns the index of a Node given by index, name or digit string"""
+        if isinstance(node, str) and not node.isdigit():    # If not a digit
+            return (self.get_invert_id(node))
+        return (int(node))
+
+    @instrumented("traceroute")
+    def route(self, node_A: int | str, node_B: int | str) -> list:
+        """
+        Iteratively walks the next hop matrix from node A to node B.
+        \nReturns the route as [(node_name, weight), ], starting with (node_A, 0). It's empty if B cannot be reached.
+        """
+        node_A, node_B = self._parse_node(node_A), self._parse_node(node_B)
+        next_hop = self.routes.next_hop
+        route = [(self.nodes.names[node_A], 0)]
+        current = node_A
+        self.instrumentation.count("traceroute_queries")
+        while current != node_B:
+            following = int(next_hop[current, node_B])
+            if following < 0:
+                return ([])
+            if len(route) > self.size:
+                raise RuntimeError(f"The routing tables loop between {route[-2][0]} and {route[-1][0]}")
+            route += [(self.nodes.names[following], float(self.get_link(self.matrix, current, following)))]
+            current = following
+        self.instrumentation.count("traceroute_hops", len(route) - 1)
+        return (route)
+
+    def traceroute(self, node_A: int | str, node_B: int | str, **kwargs):
+        """Traces the route from node A to node B with the routing tables, see route.
+        \n Optionnal Arguments:
+        \n - display: bool = True -> Used to display the results when called. Otherwise, returns the total weight.
+        \n - k: int = 1 -> Traces the k shortest routes instead (see k_shortest_paths), the weights are then a list.
+        """
+        # Error and format handling
+        if type(node_A) is not type(node_B):
+            raise TypeError(f"{node_A}'s type is different from {node_B}'s type.")
+
+        if kwargs.get("k", 1) > 1:
+            routes = self.k_shortest_paths(node_A, node_B, kwargs["k"])
+            if kwargs.get("display", True) is not True:
+                return ([weight for weight, _ in routes])
+            if not routes:
+                return (f"There is no route from \033[96m{node_A}\033[0m to \033[96m{node_B}\033[0m.")
+            return ("\n".join(f"Route {rank} takes \033[96m{weight} units\033[0m: \033[96m{'->'.join(route)}\033[0m"
+                              for rank, (weight, route) in enumerate(routes, 1)))
+        route = self.route(node_A, node_B)
+        weights = [step[1] for step in route]
+        if kwargs.get("display", True) is not True:
+            return (sum(weights) if route else inf)
+        if not route:
+            return (f"There is no route from \033[96m{node_A}\033[0m to \033[96m{node_B}\033[0m.")
+        return (f"The whole route takes \033[96m{sum(weights)} units ({str(weights)[1:-1]})\033[0m.\nThe route is \033[96m{'->'.join(step[0] for step in route)}\033[0m")
+
+    @instrumented("traceroute")
+    def traceroute_many(self, sources, destinations, **kwargs):
+        """
+        Traces many routes at once: every step moves all the unfinished routes by one hop in the next hop matrix.
+        \nArguments: sources and destinations are arrays of Node indexes of the same length.
+        \nOptional Arguments:
+        \n\tpaths: bool = False -> Also return the Nodes of every route.
+        \nReturns (hops, weights) or (hops, weights, nodes, offsets):
+        \n - hops: int32, number of links of each route, -1 if there is none.
+        \n - weights: float64, total weight of each route, inf if there is none.
+        \n - nodes, offsets: the route i is nodes[offsets[i]:offsets[i + 1]], source and destination included.
+        """
+        sources = asarray(sources, dtype=int64)
+        destinations = asarray(destinations, dtype=int64)
+        next_hop = self.routes.next_hop
+        reachable = (sources == destinations) | (next_hop[sources, destinations] >= 0)
+        if self.routes.compressed:  # No distance matrix: the weights of the links are added at every step
+            weights = where(reachable, 0.0, inf)
+            csr = self.matrix.csr()
+            keys = link_keys(*csr[:2])
+        else:
+            weights = where(reachable, self.routes.distance[sources, destinations].astype(float64), inf)
+
+        # First pass: the number of hops of every route
+        hops = where(reachable, 0, -1).astype(int32)
+        current = sources.copy()
+        active = nonzero(reachable & (sources != destinations))[0]
+        while len(active):
+            if hops[active[0]] >= self.size:
+                raise RuntimeError("The routing tables contain a loop")
+            following = next_hop[current[active], destinations[active]]
+            if self.routes.compressed:
+                weights[active] += link_weights(*csr, current[active], following, keys)
+            current[active] = following
+            hops[active] += 1
+            active = active[current[active] != destinations[active]]
+        self.instrumentation.count("traceroute_queries", len(sources))
+        self.instrumentation.count("traceroute_hops", int(hops[hops > 0].sum()))
+        if not kwargs.get("paths", False):
+            return (hops, weights)
+
+        # Second pass: the routes are written in place in a flattened array
+        offsets = zeros(len(sources) + 1, dtype=int64)
+        cumsum(where(reachable, hops + 1, 0), out=offsets[1:])
+        nodes = empty(offsets[-1], dtype=int32)
+        current = sources.copy()
+        active = nonzero(reachable)[0]
+        step = 0
+        while len(active):
+            nodes[offsets[active] + step] = current[active]
+            active = active[current[active] != destinations[active]]
+            current[active] = next_hop[current[active], destinations[active]]
+            step += 1
+        return (hops, weights, nodes, offsets)
+
+    def next_hops(self, node_A: int | str, node_B: int | str) -> list:
+        """
+        Returns the names of every neighbor of node A starting a shortest route to node B:
+        the next hop of the routing tables first, then the other equal-cost ones if they were computed (ecmp).
+        """
+        node_A, node_B = self._parse_node(node_A), self._parse_node(node_B)
+        first = int(self.routes.next_hop[node_A, node_B])
+        if first < 0:
+            return ([])
+        hops = [first]
+        if self.routes.equal_cost is not None:
+            hops += self.routes.equal_cost.extra([node_A], [node_B])[1].tolist()
+        return ([self.nodes.names[hop] for hop in hops])
+
+    @instrumented("traceroute")
+    def k_shortest_paths(self, node_A: int | str, node_B: int | str, k: int = 3) -> list:
+        """
+        Returns the k shortest loopless routes from node A to node B as [(total weight, [names]), ], shortest first,
+        computed on demand over the CSR adjacency with Yen's algorithm (see k_shortest_paths at the module level).
+        The routing tables are not used, they may be compressed or not computed at all.
+        """
+        node_A, node_B = self._parse_node(node_A), self._parse_node(node_B)
+        routes = k_shortest_paths(*self.matrix.csr(), node_A, node_B, k)
+        self.instrumentation.count("traceroute_queries")
+        return ([(weight, [self.nodes.names[node] for node in route]) for weight, route in routes])
+
+    @instrumented("traceroute")
+    def link_utilization(self, traffic, **kwargs):
+        """
+        Replays a traffic matrix over the routing tables and returns the volume carried by every link.
+        \nArguments: traffic is a size x size matrix of volumes, or three arrays (sources, destinations, volumes).
+        \nOptional Arguments:
+        \n\tecmp: bool = True -> Split the volume equally between the equal-cost next hops, if they were computed.
+        Otherwise every volume follows the single next hop of the routing tables.
+        \nReturns (node_A, node_B, forward, backward), the edges of matrix.edges() with the volume carried from
+        node_A to node_B and from node_B to node_A. The volumes of unreachable destinations are not counted.
+        """
+        if isinstance(traffic, tuple):
+            sources, destinations, volumes = (asarray(item) for item in traffic)
+        else:
+            sources, destinations = nonzero(asarray(traffic))
+            volumes = asarray(traffic)[sources, destinations]
+        sources, destinations = sources.astype(int64), destinations.astype(int64)
+        volumes = volumes.astype(float64)
+        equal_cost = self.routes.equal_cost if kwargs.get("ecmp", True) else None
+        next_hop = self.routes.next_hop
+        indptr, indices, _ = self.matrix.csr()
+        keys = link_keys(indptr, indices)
+        load = zeros(len(keys), dtype=float64)
+
+        # Every round moves each flow (node, destination, volume) by one hop, the flows reaching the same
+        # (node, destination) are merged: there are never more flows than pairs, whatever the number of routes
+        active = (sources != destinations) & (volumes != 0)
+        current, destinations, volumes = sources[active], destinations[active], volumes[active]
+        rounds = 0
+        while len(current):
+            if rounds > self.size:
+                raise RuntimeError("The routing tables contain a loop")
+            first = next_hop[current, destinations].astype(int64)
+            routed = first >= 0
+            current, destinations, volumes, first = current[routed], destinations[routed], volumes[routed], first[routed]
+            if equal_cost is not None:
+                flow, extra = equal_cost.extra(current, destinations)
+                volumes = volumes / (bincount(flow, minlength=len(current)) + 1)
+                flow = concatenate([arange(len(current)), flow])
+                following = concatenate([first, extra.astype(int64)])
+            else:
+                flow, following = arange(len(current)), first
+            load += bincount(searchsorted(keys, current[flow] * self.size + following), volumes[flow], len(keys))
+
+            pairs, inverse = unique(following * self.size + destinations[flow], return_inverse=True)
+            volumes = bincount(inverse, volumes[flow], len(pairs))
+            current, destinations = pairs // self.size, pairs % self.size
+            active = current != destinations
+            current, destinations, volumes = current[active], destinations[active], volumes[active]
+            rounds += 1
+
+        node_A, node_B, _ = self.matrix.edges()
+        node_A, node_B = node_A.astype(int64), node_B.astype(int64)
+        forward = load[searchsorted(keys, node_A * self.size + node_B)]
+        backward = load[searchsorted(keys, node_B * self.size + node_A)]
+        return (node_A, node_B, forward, backward)
+